@@ -9,16 +9,124 @@ arcgis2geojson is made available under the MIT License.
 """
 
 import argparse
+import codecs
+import contextvars
+import glob
+import gzip
+import hashlib
+import importlib
+import io
 import json
 import logging
+import math
+import mmap
 import numbers
+import os
 import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from copy import deepcopy
+from functools import lru_cache, partial
+from itertools import accumulate, chain, repeat
+from operator import itemgetter
 
+from . import pbf
 from .__version__ import __version__
 
 logger = logging.getLogger(__name__)
 
 
+class ConversionStats:
+    """
+    time spent in each stage of a conversion (in seconds) and counts of
+    what was converted, recorded inside collect_stats()
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def time(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def merge(self, timings, counters):
+        for stage, seconds in timings.items():
+            self.time(stage, seconds)
+        for counter, n in counters.items():
+            self.count(counter, n)
+
+    def report(self):
+        lines = [
+            f"{stage:<24}{seconds:>12.4f}s" for stage, seconds in self.timings.items()
+        ]
+        lines.extend(f"{counter:<24}{n:>12,}" for counter, n in self.counters.items())
+        return "\n".join(lines)
+
+
+_stats = contextvars.ContextVar("arcgis2geojson_stats", default=None)
+
+
+@contextmanager
+def collect_stats(callback=None):
+    """
+    Record timings and counters for conversions run inside this context,
+    yielding the ConversionStats they are recorded in. If callback is
+    given, it is called with them on exit.
+    """
+
+    stats = ConversionStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+        if callback is not None:
+            callback(stats)
+
+
+@contextmanager
+def _stage(name):
+    stats = _stats.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.time(name, time.perf_counter() - start)
+
+
+def _timed(function, name):
+    """
+    function, timing each call as the stage name if stats are being
+    collected. for stages that are interleaved, e.g. a feature at a time
+    """
+
+    stats = _stats.get()
+    if stats is None:
+        return function
+
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            stats.time(name, time.perf_counter() - start)
+
+    return timed
+
+
 def pointsEqual(a, b):
     """
     checks if 2 [x, y] points are equal
@@ -29,15 +137,136 @@ def pointsEqual(a, b):
     return True
 
 
-def closeRing(coordinates):
+def closeRing(coordinates, inPlace=False):
     """
-    checks if the first and last points of a ring are equal and closes the ring
+    checks if the first and last points of a ring are equal and closes the ring.
+    an open ring is copied rather than modified, unless inPlace is set
     """
     if not pointsEqual(coordinates[0], coordinates[len(coordinates) - 1]):
-        coordinates.append(coordinates[0])
+        if inPlace:
+            coordinates.append(coordinates[0])
+        else:
+            coordinates = coordinates + [coordinates[0]]
     return coordinates
 
 
+def copyCoordinates(coordinates, depth):
+    """
+    copy a nested coordinate array down to the individual vertices. depth is
+    the number of levels of nesting above a vertex
+    """
+    if depth == 0:
+        return list(coordinates)
+    return [copyCoordinates(c, depth - 1) for c in coordinates]
+
+
+def roundPosition(position, precision):
+    return [
+        round(value, precision) if _isNumber(value) else value for value in position
+    ]
+
+
+def roundPositions(positions, precision, minLength=None):
+    """
+    copy a list of positions, rounding their values to precision decimal
+    places. if minLength is set, consecutive positions made equal by the
+    rounding are removed, unless that would leave fewer than minLength
+    """
+
+    try:
+        rounded = [[round(value, precision) for value in p] for p in positions]
+    except TypeError:
+        # e.g. a null m value
+        rounded = [roundPosition(p, precision) for p in positions]
+    if minLength is None or not rounded:
+        return rounded
+
+    deduped = [rounded[0]]
+    for position in rounded:
+        if position != deduped[-1]:
+            deduped.append(position)
+    return deduped if len(deduped) >= minLength else rounded
+
+
+def simplifyPositions(positions, tolerance):
+    """
+    simplify a line with the Douglas-Peucker algorithm, keeping the vertices
+    further than tolerance from the simplified line. the positions kept are
+    not copied
+    """
+
+    last = len(positions) - 1
+    if last < 2:
+        return list(positions)
+
+    xs = [position[0] for position in positions]
+    ys = [position[1] for position in positions]
+    sqTolerance = tolerance * tolerance
+    keep = [False] * (last + 1)
+    keep[0] = keep[last] = True
+    stack = [(0, last)]
+    while stack:
+        first, end = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[end] - ax, ys[end] - ay
+        sqLength = dx * dx + dy * dy
+        sqMax = sqTolerance
+        index = None
+        for i in range(first + 1, end):
+            px = xs[i] - ax
+            py = ys[i] - ay
+            if sqLength:
+                # distance to the closest point on the segment
+                t = (px * dx + py * dy) / sqLength
+                if t > 1:
+                    px -= dx
+                    py -= dy
+                elif t > 0:
+                    px -= t * dx
+                    py -= t * dy
+            sqDistance = px * px + py * py
+            if sqDistance > sqMax:
+                sqMax = sqDistance
+                index = i
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, end))
+
+    return [position for position, kept in zip(positions, keep) if kept]
+
+
+def simplifyRing(ring, tolerance):
+    """
+    simplify a polygon ring as simplifyPositions() does. the ring is returned
+    unchanged if simplifying it would leave too few vertices for a ring or
+    reverse its orientation (making an outer ring a hole, or vice versa)
+    """
+
+    simplified = simplifyPositions(ring, tolerance)
+    if len(simplified) == len(ring):
+        return ring
+    minLength = 4 if pointsEqual(ring[0], ring[-1]) else 3
+    if len(simplified) < minLength:
+        return ring
+    if ringIsClockwise(simplified) != ringIsClockwise(ring):
+        return ring
+    return simplified
+
+
+def reverseRing(ring, copy=None):
+    """
+    get a ring with its winding order reversed. with copy=False the ring is
+    reversed in place, with copy=True every vertex is copied too
+    """
+    if copy is False:
+        ring.reverse()
+        return ring
+    if copy:
+        return [list(pt) for pt in reversed(ring)]
+    return ring[::-1]
+
+
 def ringIsClockwise(ringToTest):
     """
     determine if polygon ring coordinates are clockwise. clockwise signifies
@@ -72,11 +301,52 @@ def vertexIntersectsVertex(a1, a2, b1, b2):
     return False
 
 
+def ringSegments(ring, which):
+    """
+    get the segments of a ring as (xmin, xmax, ymin, ymax, which, index)
+    """
+    segments = []
+    for i in range(0, len(ring) - 1):
+        p1 = ring[i]
+        p2 = ring[i + 1]
+        if p1[0] <= p2[0]:
+            xmin, xmax = p1[0], p2[0]
+        else:
+            xmin, xmax = p2[0], p1[0]
+        if p1[1] <= p2[1]:
+            ymin, ymax = p1[1], p2[1]
+        else:
+            ymin, ymax = p2[1], p1[1]
+        segments.append((xmin, xmax, ymin, ymax, which, i))
+    return segments
+
+
 def arrayIntersectsArray(a, b):
-    for i in range(0, len(a) - 1):
-        for j in range(0, len(b) - 1):
+    """
+    do any segments of a intersect any segments of b? segments from both
+    rings are swept in order of xmin, so only pairs whose bounding boxes
+    overlap are tested exactly
+    """
+
+    segments = ringSegments(a, 0) + ringSegments(b, 1)
+    segments.sort(key=itemgetter(0))
+
+    active = ([], [])
+    for segment in segments:
+        xmin, _, ymin, ymax, which, index = segment
+        stillActive = []
+        for other in active[1 - which]:
+            # segments ending before this one starts can't touch anything else
+            if other[1] < xmin:
+                continue
+            stillActive.append(other)
+            if other[2] > ymax or other[3] < ymin:
+                continue
+            i, j = (index, other[5]) if which == 0 else (other[5], index)
             if vertexIntersectsVertex(a[i], a[i + 1], b[j], b[j + 1]):
                 return True
+        active[1 - which][:] = stillActive
+        active[which].append(segment)
 
     return False
 
@@ -109,78 +379,399 @@ def coordinatesContainCoordinates(outer, inner):
     return False
 
 
-def convertRingsToGeoJSON(rings):
+def ringEnvelope(ring):
+    """
+    get the bounding box of a ring as (xmin, ymin, xmax, ymax)
+    """
+    xs = [pt[0] for pt in ring]
+    ys = [pt[1] for pt in ring]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def envelopeContainsEnvelope(outer, inner):
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and outer[2] >= inner[2]
+        and outer[3] >= inner[3]
+    )
+
+
+def envelopesIntersect(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class _EnvelopeIndex:
+    """
+    a grid of cells listing the outer rings whose envelope overlaps each
+    one, so the candidates for a hole are found in the cells it overlaps
+    rather than by testing every outer ring. cells are sized from the mean
+    envelope of the rings added before the first lookup. envelopes covering
+    too many cells (or without finite bounds) are candidates for every hole
+    """
+
+    maxCells = 64
+
+    def __init__(self):
+        self.envelopes = []
+        self.cells = None
+        self.everywhere = []
+
+    def add(self, envelope):
+        self.envelopes.append(envelope)
+        if self.cells is not None:
+            self._insert(len(self.envelopes) - 1)
+
+    def _build(self):
+        count = len(self.envelopes) or 1
+        width = sum(e[2] - e[0] for e in self.envelopes) / count
+        height = sum(e[3] - e[1] for e in self.envelopes) / count
+        finite = math.isfinite(width) and math.isfinite(height)
+        self.cellWidth = width if finite and width > 0 else height
+        self.cellHeight = height if finite and height > 0 else self.cellWidth
+        if not (math.isfinite(self.cellHeight) and self.cellHeight > 0):
+            self.cellWidth = self.cellHeight = 1.0
+        self.cells = {}
+        for x in range(len(self.envelopes)):
+            self._insert(x)
+
+    def _cellRange(self, envelope):
+        # the cells an envelope overlaps, or None if there are too many
+        if not all(map(math.isfinite, envelope)):
+            return None
+        xs = range(
+            math.floor(envelope[0] / self.cellWidth),
+            math.floor(envelope[2] / self.cellWidth) + 1,
+        )
+        ys = range(
+            math.floor(envelope[1] / self.cellHeight),
+            math.floor(envelope[3] / self.cellHeight) + 1,
+        )
+        if len(xs) * len(ys) > self.maxCells:
+            return None
+        return [(x, y) for x in xs for y in ys]
+
+    def _insert(self, x):
+        cells = self._cellRange(self.envelopes[x])
+        if cells is None:
+            self.everywhere.append(x)
+            return
+        for cell in cells:
+            self.cells.setdefault(cell, []).append(x)
+
+    def candidates(self, envelope, test):
+        """
+        iterate over the positions of outer rings whose envelope passes
+        test, in the reverse insertion order the exact tests are run in
+        """
+        if self.cells is None:
+            self._build()
+        cells = self._cellRange(envelope)
+        if cells is None:
+            found = range(len(self.envelopes) - 1, -1, -1)
+        else:
+            found = set(self.everywhere)
+            for cell in cells:
+                found.update(self.cells.get(cell, ()))
+            found = sorted(found, reverse=True)
+        for x in found:
+            if test(self.envelopes[x], envelope):
+                yield x
+
+
+def numpyRingArray(ring):
+    """
+    copy the x and y values of a ring into a contiguous float64 array
+    """
+    try:
+        return numpy.ascontiguousarray(numpy.asarray(ring, dtype=float)[:, :2])
+    except ValueError:
+        # mixed 2d/3d vertices
+        return numpy.array([(pt[0], pt[1]) for pt in ring], dtype=float)
+
+
+def numpyRingEnvelope(ring):
+    return tuple(ring.min(axis=0).tolist() + ring.max(axis=0).tolist())
+
+
+def numpyRingIsClockwise(ringToTest):
+    x = ringToTest[:, 0]
+    y = ringToTest[:, 1]
+    return bool(((x[1:] - x[:-1]) * (y[1:] + y[:-1])).sum() >= 0)
+
+
+def numpyCoordinatesContainPoint(coordinates, point):
+    ci = coordinates
+    cj = numpy.roll(coordinates, 1, axis=0)
+    px, py = point[0], point[1]
+    crosses = ((ci[:, 1] <= py) & (py < cj[:, 1])) | (
+        (cj[:, 1] <= py) & (py < ci[:, 1])
+    )
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        xIntersect = (cj[:, 0] - ci[:, 0]) * (py - ci[:, 1]) / (
+            cj[:, 1] - ci[:, 1]
+        ) + ci[:, 0]
+    return bool(numpy.count_nonzero(crosses & (px < xIntersect)) % 2)
+
+
+def numpySegmentEnvelopes(ring):
+    p1 = ring[:-1]
+    p2 = ring[1:]
+    return (
+        numpy.minimum(p1[:, 0], p2[:, 0]),
+        numpy.minimum(p1[:, 1], p2[:, 1]),
+        numpy.maximum(p1[:, 0], p2[:, 0]),
+        numpy.maximum(p1[:, 1], p2[:, 1]),
+    )
+
+
+def numpyArrayIntersectsArray(a, b, blockSize=1 << 16):
+    """
+    vectorised version of arrayIntersectsArray. segments of b are sorted by
+    xmin so the candidates for each segment of a can be found with a binary
+    search, then candidate pairs are tested in blocks, returning as soon as a
+    block contains an intersection
+    """
+    if len(a) < 2 or len(b) < 2:
+        return False
+
+    aXmin, aYmin, aXmax, aYmax = numpySegmentEnvelopes(a)
+    bXmin, bYmin, bXmax, bYmax = numpySegmentEnvelopes(b)
+
+    order = numpy.argsort(bXmin, kind="stable")
+    sortedXmin = bXmin[order]
+    widest = (bXmax - bXmin).max()
+    lo = numpy.searchsorted(
+        sortedXmin, numpy.nextafter(aXmin - widest, -numpy.inf), "left"
+    )
+    hi = numpy.searchsorted(sortedXmin, aXmax, "right")
+    counts = numpy.maximum(hi - lo, 0)
+    ends = numpy.cumsum(counts)
+
+    start = 0
+    while start < len(counts):
+        before = ends[start] - counts[start]
+        stop = max(
+            start + 1, int(numpy.searchsorted(ends, before + blockSize, "right"))
+        )
+
+        # expand the candidate ranges of this block of a into (i, j) pairs
+        blockCounts = counts[start:stop]
+        i = numpy.repeat(numpy.arange(start, stop), blockCounts)
+        offsets = numpy.arange(len(i)) - numpy.repeat(
+            ends[start:stop] - blockCounts - before, blockCounts
+        )
+        j = order[numpy.repeat(lo[start:stop], blockCounts) + offsets]
+
+        overlaps = (
+            (bXmax[j] >= aXmin[i])
+            & (bXmin[j] <= aXmax[i])
+            & (bYmax[j] >= aYmin[i])
+            & (bYmin[j] <= aYmax[i])
+        )
+        i = i[overlaps]
+        j = j[overlaps]
+
+        a1x, a1y = a[i, 0], a[i, 1]
+        a2x, a2y = a[i + 1, 0], a[i + 1, 1]
+        b1x, b1y = b[j, 0], b[j, 1]
+        b2x, b2y = b[j + 1, 0], b[j + 1, 1]
+        uaT = (b2x - b1x) * (a1y - b1y) - (b2y - b1y) * (a1x - b1x)
+        ubT = (a2x - a1x) * (a1y - b1y) - (a2y - a1y) * (a1x - b1x)
+        uB = (b2y - b1y) * (a2x - a1x) - (b2x - b1x) * (a2y - a1y)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            ua = uaT / uB
+            ub = ubT / uB
+        if numpy.any((uB != 0) & (ua >= 0) & (ua <= 1) & (ub >= 0) & (ub <= 1)):
+            return True
+
+        start = stop
+
+    return False
+
+
+GeometryKernels = namedtuple(
+    "GeometryKernels",
+    ["prepare", "envelope", "isClockwise", "containsPoint", "intersects"],
+)
+
+pythonKernels = GeometryKernels(
+    lambda ring: ring,
+    ringEnvelope,
+    ringIsClockwise,
+    coordinatesContainPoint,
+    arrayIntersectsArray,
+)
+
+numpyKernels = GeometryKernels(
+    numpyRingArray,
+    numpyRingEnvelope,
+    numpyRingIsClockwise,
+    numpyCoordinatesContainPoint,
+    numpyArrayIntersectsArray,
+)
+
+# below this many vertices per polygon the cost of building arrays outweighs
+# the vectorised tests, so the 'auto' backend sticks to pure python
+NUMPY_MIN_VERTICES = 512
+
+_geometryBackend = "auto"
+
+# numpy is slow to import, so it is only imported once something needs it
+numpy = None
+_numpyImported = False
+
+
+def _importNumpy():
+    """import numpy the first time it is needed, returning None if it isn't installed"""
+    global numpy, _numpyImported
+
+    if not _numpyImported:
+        try:
+            numpy = importlib.import_module("numpy")
+        except ImportError:
+            pass
+        _numpyImported = True
+    return numpy
+
+
+def set_geometry_backend(name="auto"):
+    """
+    choose the implementation of the ring geometry tests used by
+    convertRingsToGeoJSON: 'python', 'numpy', or 'auto' to use numpy (if it
+    is installed) for polygons with at least NUMPY_MIN_VERTICES vertices
+    """
+    global _geometryBackend
+
+    if name not in ("auto", "python", "numpy"):
+        raise ValueError(f"Unknown geometry backend '{name}'")
+    if name == "numpy" and _importNumpy() is None:
+        raise ImportError("The numpy geometry backend requires numpy")
+    _geometryBackend = name
+
+
+def get_geometry_backend():
+    return _geometryBackend
+
+
+def geometryKernels(rings):
+    if _geometryBackend == "numpy" or (
+        _geometryBackend == "auto"
+        and sum(len(ring) for ring in rings) >= NUMPY_MIN_VERTICES
+        and _importNumpy() is not None
+    ):
+        return numpyKernels
+    return pythonKernels
+
+
+def convertRingsToGeoJSON(rings, copy=None):
     """
     do any polygons in this array contain any other polygons in this array?
-    used for checking for holes in arcgis rings
+    used for checking for holes in arcgis rings. see convert() for copy
     """
 
+    stats = _stats.get()
+    if stats is not None:
+        start = time.perf_counter()
+
+    kernels = geometryKernels(rings)
+
     outerRings = []
+    outerShapes = []  # outer rings in the form the kernels work on
+    outerIndex = _EnvelopeIndex()
     holes = []
-    x = None  # iterator
     outerRing = None  # current outer ring being evaluated
     hole = None  # current hole being evaluated
 
     # for each ring
     for r in range(0, len(rings)):
-        ring = closeRing(rings[r])
+        ring = closeRing(rings[r], inPlace=copy is False)
         if len(ring) < 4:
             continue
 
+        shape = kernels.prepare(ring)
+        clockwise = kernels.isClockwise(shape)
+
+        # wind outer rings counterclockwise and inner rings clockwise for
+        # RFC 7946 compliance
+        reversedRing = reverseRing(ring, copy)
+        reversedShape = reversedRing if shape is ring else shape[::-1]
+
         # is this ring an outer ring? is it clockwise?
-        if ringIsClockwise(ring):
-            polygon = [ring[::-1]]
-            outerRings.append(
-                polygon
-            )  # wind outer rings counterclockwise for RFC 7946 compliance
+        if clockwise:
+            outerRings.append([reversedRing])
+            outerShapes.append(reversedShape)
+            outerIndex.add(kernels.envelope(shape))
         else:
-            holes.append(
-                ring[::-1]
-            )  # wind inner rings clockwise for RFC 7946 compliance
+            holes.append((reversedRing, reversedShape))
+
+    if stats is not None:
+        oriented = time.perf_counter()
+        stats.time("orient rings", oriented - start)
+        stats.count("rings", len(rings))
+        stats.count("outer rings", len(outerRings))
+        stats.count("holes", len(holes))
+        holeCount = len(holes)
 
     uncontainedHoles = []
 
     # while there are holes left...
     while len(holes):
         # pop a hole off out stack
-        hole = holes.pop()
+        hole, shape = holes.pop()
+        envelope = kernels.envelope(shape)
 
-        # loop over all outer rings and see if they contain our hole.
+        # loop over the outer rings whose envelope could contain our hole and
+        # see if they contain it.
         contained = False
-        x = len(outerRings) - 1
-        while x >= 0:
-            outerRing = outerRings[x][0]
-            if coordinatesContainCoordinates(outerRing, hole):
+        for x in outerIndex.candidates(envelope, envelopeContainsEnvelope):
+            outerRing = outerShapes[x]
+            if kernels.containsPoint(outerRing, shape[0]) and not kernels.intersects(
+                outerRing, shape
+            ):
                 # the hole is contained push it into our polygon
                 outerRings[x].append(hole)
                 contained = True
                 break
-            x = x - 1
 
         # ring is not contained in any outer ring
         # sometimes this happens https://github.com/Esri/esri-leaflet/issues/320
         if not contained:
-            uncontainedHoles.append(hole)
+            uncontainedHoles.append((hole, shape, envelope))
+
+    if stats is not None:
+        stats.count("holes contained", holeCount - len(uncontainedHoles))
+        uncontainedCount = len(uncontainedHoles)
+    promoted = 0
 
     # if we couldn't match any holes using contains we can try intersects...
     while len(uncontainedHoles):
         # pop a hole off out stack
-        hole = uncontainedHoles.pop()
+        hole, shape, envelope = uncontainedHoles.pop()
 
-        # loop over all outer rings and see if any intersect our hole.
+        # loop over the outer rings whose envelope touches our hole and see if
+        # any intersect it.
         intersects = False
-        x = len(outerRings) - 1
-        while x >= 0:
-            outerRing = outerRings[x][0]
-            if arrayIntersectsArray(outerRing, hole):
+        for x in outerIndex.candidates(envelope, envelopesIntersect):
+            outerRing = outerShapes[x]
+            if kernels.intersects(outerRing, shape):
                 # the hole is contained push it into our polygon
                 outerRings[x].append(hole)
                 intersects = True
                 break
-            x = x - 1
 
         if not intersects:
-            outerRings.append([hole[::-1]])
+            # holes are never aliased, so can be rewound in place
+            hole.reverse()
+            outerRings.append([hole])
+            outerShapes.append(hole if shape is hole else shape[::-1])
+            outerIndex.add(envelope)
+            promoted += 1
+
+    if stats is not None:
+        stats.count("holes intersected", uncontainedCount - promoted)
+        stats.count("holes promoted", promoted)
+        stats.time("match holes", time.perf_counter() - oriented)
 
     if len(outerRings) == 1:
         return {"type": "Polygon", "coordinates": outerRings[0]}
@@ -188,6 +779,55 @@ def convertRingsToGeoJSON(rings):
         return {"type": "MultiPolygon", "coordinates": outerRings}
 
 
+def simplifyPolygon(polygon, tolerance):
+    """
+    simplify the rings of a polygon (an outer ring followed by its holes) as
+    simplifyRing() does, keeping its holes valid. a simplified hole that is
+    no longer inside the simplified outer ring, or crosses it, is kept as it
+    was. if even that isn't inside, the outer ring is kept as it was. holes
+    that weren't inside the outer ring to begin with aren't checked
+    """
+
+    outer, holes = polygon[0], polygon[1:]
+    simplifiedOuter = simplifyRing(outer, tolerance)
+    if not holes:
+        return [simplifiedOuter]
+    simplifiedHoles = [simplifyRing(hole, tolerance) for hole in holes]
+    if simplifiedOuter is outer and all(
+        simplified is hole for simplified, hole in zip(simplifiedHoles, holes)
+    ):
+        return polygon
+
+    kernels = geometryKernels(polygon)
+
+    def contains(outerShape, ring):
+        shape = kernels.prepare(ring)
+        return kernels.containsPoint(outerShape, shape[0]) and not (
+            kernels.intersects(outerShape, shape)
+        )
+
+    outerShape = kernels.prepare(outer)
+    inside = [contains(outerShape, hole) for hole in holes]
+    if simplifiedOuter is not outer:
+        simplifiedShape = kernels.prepare(simplifiedOuter)
+        # the outer ring can only be simplified if every hole fits in it
+        for hole, simplified, wasInside in zip(holes, simplifiedHoles, inside):
+            if wasInside and not (
+                contains(simplifiedShape, simplified) or contains(simplifiedShape, hole)
+            ):
+                simplifiedOuter, simplifiedShape = outer, outerShape
+                break
+        outerShape = simplifiedShape
+
+    rings = [simplifiedOuter]
+    for hole, simplified, wasInside in zip(holes, simplifiedHoles, inside):
+        if wasInside and simplified is not hole:
+            if not contains(outerShape, simplified):
+                simplified = hole
+        rings.append(simplified)
+    return rings
+
+
 def getId(attributes, idAttribute=None):
     keys = [idAttribute, "OBJECTID", "FID"] if idAttribute else ["OBJECTID", "FID"]
     for key in keys:
@@ -199,145 +839,2766 @@ def getId(attributes, idAttribute=None):
     raise KeyError("No valid id attribute found")
 
 
-def arcgis2geojson(arcgis, idAttribute=None):
-    if isinstance(arcgis, str):
-        return json.dumps(convert(json.loads(arcgis), idAttribute))
+# Web Mercator and its older aliases, reprojected without pyproj
+WEB_MERCATOR_WKIDS = frozenset([102100, 102113, 3857, 900913, 3785])
+
+_earthRadius = 6378137.0
+_degrees = 180.0 / math.pi
+
+
+def webMercatorToWGS84(positions):
+    """
+    closed-form inverse spherical mercator for a list of [x, y, ...] positions
+    """
+    exp = math.exp
+    atan = math.atan
+    halfPi = math.pi / 2
+    return [
+        [
+            position[0] / _earthRadius * _degrees,
+            (2 * atan(exp(position[1] / _earthRadius)) - halfPi) * _degrees,
+            *position[2:],
+        ]
+        for position in positions
+    ]
+
+
+def _pyprojTransform(wkid):
+    try:
+        pyproj = importlib.import_module("pyproj")
+    except ImportError:
+        return None
+
+    for authority in ("EPSG", "ESRI"):
+        try:
+            crs = pyproj.CRS.from_authority(authority, wkid)
+            break
+        except pyproj.exceptions.CRSError:
+            pass
     else:
-        return convert(arcgis, idAttribute)
+        return None
+    transformer = pyproj.Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
 
+    def transform(positions):
+        xs, ys = transformer.transform(
+            [position[0] for position in positions],
+            [position[1] for position in positions],
+        )
+        return [[x, y, *position[2:]] for x, y, position in zip(xs, ys, positions)]
+
+    return transform
 
-def convert(arcgis, idAttribute=None):
+
+@lru_cache(maxsize=None)
+def get_transform(wkid):
     """
-    Convert an ArcGIS JSON object to a GeoJSON object
+    get a function reprojecting a list of [x, y, ...] positions from the
+    spatial reference with this wkid to WGS84, or None if we can't.
+    Web Mercator is always supported, anything else needs pyproj
     """
 
-    geojson = {}
+    if wkid in WEB_MERCATOR_WKIDS:
+        return webMercatorToWGS84
+    if not isinstance(wkid, int) or wkid == 4326:
+        return None
+    return _pyprojTransform(wkid)
 
-    if "features" in arcgis and arcgis["features"]:
-        geojson["type"] = "FeatureCollection"
-        geojson["features"] = []
-        for feature in arcgis["features"]:
-            geojson["features"].append(convert(feature, idAttribute))
 
-    if (
-        "x" in arcgis
-        and isinstance(arcgis["x"], numbers.Number)
-        and "y" in arcgis
-        and isinstance(arcgis["y"], numbers.Number)
-    ):
-        geojson["type"] = "Point"
-        geojson["coordinates"] = [arcgis["x"], arcgis["y"]]
-        if "z" in arcgis and isinstance(arcgis["z"], numbers.Number):
-            geojson["coordinates"].append(arcgis["z"])
+def _spatialReferenceTransform(spatialReference):
+    if not spatialReference:
+        return None
+    for key in ("latestWkid", "wkid"):
+        wkid = spatialReference.get(key)
+        if wkid is not None:
+            transform = get_transform(wkid)
+            if transform is not None:
+                return transform
+    return None
 
-    if "points" in arcgis:
-        geojson["type"] = "MultiPoint"
-        geojson["coordinates"] = arcgis["points"]
 
-    if "paths" in arcgis:
-        if len(arcgis["paths"]) == 1:
-            geojson["type"] = "LineString"
-            geojson["coordinates"] = arcgis["paths"][0]
+def reprojectCoordinates(coordinates, transform, precision=None, minLength=None):
+    """
+    reproject a GeoJSON coordinates array of any depth, transforming all of
+    its positions in a single call. if precision is set, the reprojected
+    positions are rounded as in roundPositions()
+    """
+
+    if not coordinates:
+        return coordinates
+    if _isNumber(coordinates[0]):
+        position = transform([coordinates])[0]
+        if precision is not None:
+            position = roundPosition(position, precision)
+        return position
+
+    # gather the lists of positions, transform them in one go, then split
+    arrays = []
+    stack = [coordinates]
+    while stack:
+        array = stack.pop()
+        if array and array[0] and _isNumber(array[0][0]):
+            arrays.append(array)
         else:
-            geojson["type"] = "MultiLineString"
-            geojson["coordinates"] = arcgis["paths"]
+            stack.extend(array)
+    transformed = transform([position for array in arrays for position in array])
+    replacements = {}
+    end = 0
+    for array in arrays:
+        start, end = end, end + len(array)
+        replacements[id(array)] = transformed[start:end]
+        if precision is not None:
+            replacements[id(array)] = roundPositions(
+                replacements[id(array)], precision, minLength
+            )
 
-    if "rings" in arcgis:
-        geojson = convertRingsToGeoJSON(arcgis["rings"])
+    def rebuild(array):
+        if id(array) in replacements:
+            return replacements[id(array)]
+        return [rebuild(child) for child in array]
 
-    if (
-        "xmin" in arcgis
-        and isinstance(arcgis["xmin"], numbers.Number)
-        and "ymin" in arcgis
-        and isinstance(arcgis["ymin"], numbers.Number)
-        and "xmax" in arcgis
-        and isinstance(arcgis["xmax"], numbers.Number)
-        and "ymax" in arcgis
-        and isinstance(arcgis["ymax"], numbers.Number)
-    ):
-        geojson["type"] = "Polygon"
-        geojson["coordinates"] = [
-            [
-                [arcgis["xmax"], arcgis["ymax"]],
-                [arcgis["xmin"], arcgis["ymax"]],
-                [arcgis["xmin"], arcgis["ymin"]],
-                [arcgis["xmax"], arcgis["ymin"]],
-                [arcgis["xmax"], arcgis["ymax"]],
-            ]
-        ]
+    return rebuild(coordinates)
 
-    if "geometry" in arcgis or "attributes" in arcgis:
-        geojson["type"] = "Feature"
-        if "geometry" in arcgis:
-            geojson["geometry"] = convert(arcgis["geometry"])
-        else:
-            geojson["geometry"] = None
 
-        if "attributes" in arcgis:
-            geojson["properties"] = arcgis["attributes"]
-            try:
-                geojson["id"] = getId(arcgis["attributes"], idAttribute)
-            except KeyError:
-                # don't set an id
-                pass
-        else:
-            geojson["properties"] = None
+# fewest positions a line or ring can be left with by removing duplicates
+_minLengths = {
+    "LineString": 2,
+    "MultiLineString": 2,
+    "Polygon": 4,
+    "MultiPolygon": 4,
+}
 
-    if "geometry" in geojson and not (geojson["geometry"]):
-        geojson["geometry"] = None
 
-    if (
-        "spatialReference" in arcgis
-        and "wkid" in arcgis["spatialReference"]
-        and arcgis["spatialReference"]["wkid"] != 4326
-    ):
-        logger.warning(
-            "Object converted in non-standard crs - " + str(arcgis["spatialReference"])
-        )
+def _convertReprojected(converter, arcgis, options):
+    """
+    convert an object, then reproject the geometry to WGS84 from its own
+    spatial reference, or the spatial reference of the layer it belongs to.
+    a geometry is rounded once it is reprojected, rather than before
+    """
 
-    trueCurveElements = {
-        "curveRings": "Curved Polygon",
-        "curvePaths": "Curved Polyline",
-        "a": "Elliptic Arc",
-        "b": "Bézier Curve",
-        "c": "Circular Arc",
-    }
-    for k, v in trueCurveElements.items():
-        if k in arcgis:
-            logger.warning(
-                f"Element of type '{k}' ({v}) can not be convered to GeoJSON. Converting to null geometry"
-            )
-            geojson["geometry"] = None
+    transform = _spatialReferenceTransform(
+        arcgis.get("spatialReference", options.spatialReference)
+    )
+    if transform is None:
+        return converter(arcgis, options)
 
+    geometryOptions = options
+    if converter in _geometryConverters:
+        geometryOptions = options._replace(precision=None)
+    geojson = converter(arcgis, geometryOptions)
+    if "coordinates" in geojson:
+        geojson["coordinates"] = reprojectCoordinates(
+            geojson["coordinates"],
+            transform,
+            options.precision,
+            _minLengths.get(geojson["type"]) if options.dedupe else None,
+        )
     return geojson
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert ArcGIS JSON to GeoJSON")
-    parser.add_argument(
-        "file",
-        nargs="?",
-        help="Input file, if empty stdin is used",
-        type=argparse.FileType("r"),
-        default=sys.stdin,
-    )
-    parser.add_argument(
-        "--id",
-        action="store",
-        help="Attribute to use as feature ID",
-        required=False,
-        default=None,
-    )
-    parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {__version__}"
-    )
-    args = parser.parse_args()
+JsonBackend = namedtuple("JsonBackend", ["name", "loads", "dumps", "dumpb"])
+
+# fastest first, used to pick a backend for 'auto'
+JSON_BACKENDS = ("orjson", "ujson", "simdjson", "json")
+
+
+def _stdlibDumpb(obj):
+    return json.dumps(obj).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def get_json_backend(name="json"):
+    """
+    get a JsonBackend for one of JSON_BACKENDS, or 'auto' for the fastest
+    one installed. dumps() returns str and dumpb() returns UTF-8 bytes
+    """
+
+    if name == "auto":
+        for candidate in JSON_BACKENDS:
+            try:
+                return get_json_backend(candidate)
+            except ImportError:
+                pass
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}'")
+    if name == "json":
+        return JsonBackend("json", json.loads, json.dumps, _stdlibDumpb)
 
-    if args.file.isatty():
-        parser.print_help()
-        return 0
+    module = importlib.import_module(name)
+    if name == "orjson":
+        return JsonBackend(
+            name,
+            module.loads,
+            lambda obj: module.dumps(obj).decode("utf-8"),
+            module.dumps,
+        )
+    if name == "ujson":
+        return JsonBackend(
+            name,
+            module.loads,
+            module.dumps,
+            lambda obj: module.dumps(obj).encode("utf-8"),
+        )
+    # simdjson only parses
+    return JsonBackend(name, module.loads, json.dumps, _stdlibDumpb)
+
+
+CacheInfo = namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "evictions", "maxsize", "currsize", "maxbytes", "nbytes"],
+)
+
+# levels of nesting above a position in each type of geometry
+_geometryDepths = {
+    "Point": 0,
+    "MultiPoint": 1,
+    "LineString": 1,
+    "MultiLineString": 2,
+    "Polygon": 2,
+    "MultiPolygon": 3,
+}
+
+
+def _copyGeometry(geojson):
+    copied = dict(geojson)
+    depth = _geometryDepths.get(geojson.get("type"))
+    if depth == 0:
+        copied["coordinates"] = list(geojson["coordinates"])
+    elif depth is not None:
+        # copyCoordinates(), unrolled
+        copied["coordinates"] = _copyDepth(geojson["coordinates"], depth)
+    return copied
+
+
+def _copyDepth(coordinates, depth):
+    if depth == 1:
+        return list(map(list, coordinates))
+    return [_copyDepth(c, depth - 1) for c in coordinates]
+
+
+# keys holding lists of positions, or lists of lists of positions
+_positionKeys = {"points": False, "paths": True, "rings": True}
+
+
+def _hashGeometry(arcgis, extra):
+    """
+    hash an ArcGIS geometry and anything else it's converted with, returning
+    (digest, number of bytes hashed). coordinates are hashed as doubles,
+    which is much faster than serialising them
+    """
+
+    hasher = hashlib.blake2b(repr(extra).encode("utf-8"), digest_size=16)
+    size = 0
+    for key, value in arcgis.items():
+        hasher.update(key.encode("utf-8"))
+        if key not in _positionKeys or not isinstance(value, list):
+            hasher.update(repr(value).encode("utf-8"))
+            continue
+        for part in value if _positionKeys[key] else [value]:
+            # the number of positions, then the length of each of them
+            hasher.update(len(part).to_bytes(8, "little"))
+            hasher.update(bytes(map(len, part)))
+            data = array("d", chain.from_iterable(part)).tobytes()
+            hasher.update(data)
+            size += len(data)
+    return hasher.digest(), size
+
+
+class ConversionCache:
+    """
+    LRU cache of converted geometries, which can be passed to convert() (and
+    the other converters) to avoid converting the same multipoint, polyline
+    or polygon again.
+
+    Geometries are looked up by a hash of their content and the options
+    they are converted with. Coordinates are compared as floats, so
+    geometries that differ only in e.g. 1 vs 1.0 share an entry. Up to
+    maxsize geometries are kept (any number if None, as with lru_cache),
+    and if maxbytes is set, up to that many bytes of coordinates (at 8
+    bytes a value). The least recently used geometries are evicted first.
+
+    Each lookup returns a new copy, so nothing a caller does to a converted
+    geometry can change the cache. A cache passed to a worker process
+    arrives there empty, and its counters are not reported back.
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_clear()
+
+    def __reduce__(self):
+        return (type(self), (self.maxsize, self.maxbytes))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.maxsize,
+                len(self._entries),
+                self.maxbytes,
+                self.nbytes,
+            )
+
+    def cache_clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.nbytes = 0
+
+    def convert(self, convertGeometry, converter, arcgis, options):
+        try:
+            key, size = _hashGeometry(
+                arcgis,
+                (
+                    converter.__name__,
+                    options.reproject,
+                    options.spatialReference if options.reproject else None,
+                    options.precision,
+                    options.dedupe,
+                    options.simplify,
+                ),
+            )
+        except (TypeError, ValueError, OverflowError):
+            # e.g. a null or nested coordinate, which can't be hashed as a double
+            return convertGeometry(converter, arcgis, options)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return _copyGeometry(entry[0])
+
+        geojson = convertGeometry(converter, arcgis, options)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return geojson
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (_copyGeometry(geojson), size)
+                self.nbytes += size
+            while (self.maxsize is not None and len(self._entries) > self.maxsize) or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+        return geojson
+
+
+class CompactGeometry:
+    """
+    A GeoJSON geometry with its positions packed into a flat array('d'),
+    as produced by convert() (and the other converters) with compact=True.
+    A position costs 8 bytes a value instead of a list of python floats.
+
+    parts holds the offsets (in positions) of the lines of a
+    MultiLineString or the rings of a (Multi)Polygon, and polygons the
+    offsets (in parts) of the polygons of a MultiPolygon. Both are None for
+    geometries that don't have them.
+
+    coordinates builds the nested lists of a GeoJSON geometry and
+    __geo_interface__ exposes the positions to shapely, geopandas etc. as
+    NumPy views of the array if NumPy is installed. dumps_geojson() and the
+    write_*() functions serialise the positions straight from the array.
+    """
+
+    __slots__ = ("type", "dimensions", "positions", "parts", "polygons")
+
+    def __init__(self, type, dimensions, positions, parts=None, polygons=None):
+        self.type = type
+        self.dimensions = dimensions
+        self.positions = positions
+        self.parts = parts
+        self.polygons = polygons
+
+    def __repr__(self):
+        count = len(self.positions) // self.dimensions
+        return f"<CompactGeometry {self.type} with {count} positions>"
+
+    def __eq__(self, other):
+        if isinstance(other, CompactGeometry):
+            return (
+                self.type,
+                self.dimensions,
+                self.positions,
+                self.parts,
+                self.polygons,
+            ) == (
+                other.type,
+                other.dimensions,
+                other.positions,
+                other.parts,
+                other.polygons,
+            )
+        if isinstance(other, dict):
+            return other == {"type": self.type, "coordinates": self.coordinates}
+        return NotImplemented
+
+    __hash__ = None
+
+    @property
+    def nbytes(self):
+        """the size of the arrays holding the geometry, in bytes"""
+        return sum(
+            len(values) * values.itemsize
+            for values in (self.positions, self.parts, self.polygons)
+            if values is not None
+        )
+
+    def _coordinates(self, run):
+        # run(start, end) builds the positions between two offsets
+        if self.type == "Point":
+            return run(0, 1)[0]
+        if self.parts is None:
+            return run(0, len(self.positions) // self.dimensions)
+        parts = [run(start, end) for start, end in zip(self.parts, self.parts[1:])]
+        if self.polygons is None:
+            return parts
+        return [
+            parts[start:end] for start, end in zip(self.polygons, self.polygons[1:])
+        ]
+
+    def _values(self, start, end):
+        first, last = start * self.dimensions, end * self.dimensions
+        return self.positions[first:last]
+
+    def _run(self, start, end):
+        values = self._values(start, end)
+        it = iter(values.tolist())
+        return list(map(list, zip(*[it] * self.dimensions)))
+
+    @property
+    def coordinates(self):
+        """the coordinates of the geometry, as nested lists"""
+        return self._coordinates(self._run)
+
+    @property
+    def __geo_interface__(self):
+        if _importNumpy() is None:
+            return {"type": self.type, "coordinates": self.coordinates}
+        positions = numpy.frombuffer(self.positions, dtype=numpy.float64)
+        positions = positions.reshape(-1, self.dimensions)
+        return {
+            "type": self.type,
+            "coordinates": self._coordinates(lambda start, end: positions[start:end]),
+        }
+
+    def _runJSON(self, start, end, separator=", "):
+        # positions are formatted a block at a time, so neither the values
+        # nor the format string are ever as large as a long part
+        first, last = start * self.dimensions, end * self.dimensions
+        values = memoryview(self.positions)
+        step = _JSON_BLOCK * self.dimensions
+        blocks = []
+        for offset in range(first, last, step):
+            blockEnd = min(offset + step, last)
+            block = tuple(values[offset:blockEnd])
+            if len(block) == step:
+                blockFormat = _blockFormat(self.dimensions, separator)
+            else:
+                blockFormat = _positionsFormat(
+                    self.dimensions, len(block) // self.dimensions, separator
+                )
+            blocks.append(blockFormat % block)
+        text = "[%s]" % separator.join(blocks)
+        # only nan and inf have an n in their repr. write them as json does
+        if "n" in text:
+            text = json.dumps(self._run(start, end), separators=(separator, ": "))
+        return text
+
+    def _json(self, separator=", ", keySeparator=": "):
+        if self.type == "Point":
+            coordinates = self._runJSON(0, 1, separator)[1:-1]
+        elif self.parts is None:
+            coordinates = self._runJSON(
+                0, len(self.positions) // self.dimensions, separator
+            )
+        else:
+            parts = [
+                self._runJSON(start, end, separator)
+                for start, end in zip(self.parts, self.parts[1:])
+            ]
+            if self.polygons is not None:
+                parts = [
+                    "[" + separator.join(parts[start:end]) + "]"
+                    for start, end in zip(self.polygons, self.polygons[1:])
+                ]
+            coordinates = "[" + separator.join(parts) + "]"
+        return '{"type"%s"%s"%s"coordinates"%s%s}' % (
+            keySeparator,
+            self.type,
+            separator,
+            keySeparator,
+            coordinates,
+        )
+
+
+# positions formatted at once when serialising a CompactGeometry
+_JSON_BLOCK = 1024
+
+
+def _positionsFormat(dimensions, count, separator=", "):
+    # formatting floats with %r writes them as json.dumps() does
+    position = "[" + separator.join(["%r"] * dimensions) + "]"
+    return separator.join(repeat(position, count))
+
+
+@lru_cache(maxsize=None)
+def _blockFormat(dimensions, separator=", "):
+    return _positionsFormat(dimensions, _JSON_BLOCK, separator)
+
+
+def _compactGeometry(geojson):
+    """
+    pack a converted geometry into a CompactGeometry, or return it as it was
+    if its positions can't be packed, e.g. if they aren't all numbers or
+    don't all have the same number of dimensions
+    """
+
+    geometryType = geojson.get("type")
+    depth = _geometryDepths.get(geometryType)
+    if depth is None:
+        return geojson
+    coordinates = geojson["coordinates"]
+
+    try:
+        if depth == 0:
+            return CompactGeometry(
+                geometryType, len(coordinates), array("d", coordinates)
+            )
+
+        if depth == 1:
+            runs = [coordinates]
+        elif depth == 2:
+            runs = coordinates
+        else:
+            runs = chain.from_iterable(coordinates)
+        positions = array("d")
+        parts = array("q", [0])
+        dimensions = None
+        for run in runs:
+            if dimensions is None and run:
+                dimensions = len(run[0])
+            if set(map(len, run)) - {dimensions}:
+                return geojson
+            positions.extend(chain.from_iterable(run))
+            parts.append(len(positions) // (dimensions or 2))
+    except (TypeError, ValueError, OverflowError):
+        return geojson
+
+    dimensions = dimensions or 2
+    if depth == 1:
+        return CompactGeometry(geometryType, dimensions, positions)
+    if depth == 2:
+        return CompactGeometry(geometryType, dimensions, positions, parts)
+    polygons = array("q", [0])
+    polygons.extend(accumulate(map(len, coordinates)))
+    return CompactGeometry(geometryType, dimensions, positions, parts, polygons)
+
+
+# marks a LazyFeature without an id
+_noId = object()
+
+
+class LazyFeature(Mapping):
+    """
+    A GeoJSON Feature whose geometry is only converted when it is first
+    used, as produced by convert() (and the other converters) with
+    lazy=True. properties and id are set when the feature is created, so
+    features can be filtered by them without converting any geometries.
+
+    A LazyFeature is a read-only mapping with the keys of a Feature dict.
+    The geometry is converted (once) when the geometry attribute or key is
+    read, the feature is compared or copied to a dict, or it is serialised
+    by dumps_geojson() or the write_*() functions. Until then it holds on
+    to the ArcGIS geometry, which must not be changed in the meantime.
+    """
+
+    __slots__ = ("properties", "_id", "_geometry", "_convertGeometry")
+
+    def __init__(self, convertGeometry, properties, id=_noId):
+        self.properties = properties
+        self._id = id
+        self._geometry = None
+        self._convertGeometry = convertGeometry
+
+    @property
+    def id(self):
+        return None if self._id is _noId else self._id
+
+    @property
+    def geometry(self):
+        if self._convertGeometry is not None:
+            self._geometry = self._convertGeometry()
+            # drop the ArcGIS geometry
+            self._convertGeometry = None
+        return self._geometry
+
+    @property
+    def converted(self):
+        """whether the geometry has been converted yet"""
+        return self._convertGeometry is None
+
+    @property
+    def __geo_interface__(self):
+        return dict(self)
+
+    def __getitem__(self, key):
+        if key == "type":
+            return "Feature"
+        if key == "geometry":
+            return self.geometry
+        if key == "properties":
+            return self.properties
+        if key == "id" and self._id is not _noId:
+            return self._id
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from ("type", "geometry", "properties")
+        if self._id is not _noId:
+            yield "id"
+
+    def __len__(self):
+        return 3 if self._id is _noId else 4
+
+    def __repr__(self):
+        state = "converted" if self.converted else "not converted"
+        return f"<LazyFeature id={self.id!r} geometry {state}>"
+
+
+def _separators(dumps):
+    """
+    get the separators dumps writes between items and after keys, as str
+    """
+    text = dumps({"a": [0, 0]})
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    keyEnd, listStart = text.index('"', 2) + 1, text.index("[")
+    first, last = text.index("0") + 1, text.rindex("0")
+    return text[first:last], text[keyEnd:listStart]
+
+
+def _geojsonEncoder(dumps):
+    """
+    get a function serialising GeoJSON with dumps, to str or bytes as dumps
+    does, except for any CompactGeometry, which is serialised from its
+    array. the JSON written around it is separated as dumps separates it
+    """
+
+    separator, keySeparator = _separators(dumps)
+    if isinstance(dumps({}), bytes):
+
+        def literal(text):
+            return text.encode("utf-8")
+
+    else:
+
+        def literal(text):
+            return text
+
+    itemSeparator = literal(separator)
+    empty = literal("")
+    geometryKey = literal('"geometry"' + keySeparator)
+    featuresKey = literal('"features"' + keySeparator + "[")
+    objectEnd = literal("}")
+    featuresEnd = literal("]}")
+
+    def encodeCompact(geometry):
+        return literal(geometry._json(separator, keySeparator))
+
+    def encodeFeature(feature):
+        if isinstance(feature, LazyFeature):
+            feature = dict(feature)
+        geometry = feature.get("geometry")
+        if not isinstance(geometry, CompactGeometry):
+            return dumps(feature)
+        rest = {key: value for key, value in feature.items() if key != "geometry"}
+        return (
+            dumps(rest)[:-1]
+            + (itemSeparator if rest else empty)
+            + geometryKey
+            + encodeCompact(geometry)
+            + objectEnd
+        )
+
+    def encode(geojson):
+        if isinstance(geojson, CompactGeometry):
+            return encodeCompact(geojson)
+        if not isinstance(geojson, (dict, LazyFeature)):
+            return dumps(geojson)
+        if geojson.get("type") == "FeatureCollection" and "features" in geojson:
+            rest = {key: value for key, value in geojson.items() if key != "features"}
+            return (
+                dumps(rest)[:-1]
+                + (itemSeparator if rest else empty)
+                + featuresKey
+                + itemSeparator.join(map(encodeFeature, geojson["features"]))
+                + featuresEnd
+            )
+        return encodeFeature(geojson)
+
+    return encode
+
+
+def dumps_geojson(geojson, jsonBackend="json"):
+    """
+    Serialise a GeoJSON object to str with the named JSON backend, including
+    any CompactGeometry in it, which is written straight from its array
+    """
+    return _geojsonEncoder(get_json_backend(jsonBackend).dumps)(geojson)
+
+
+def arcgis2geojson(
+    arcgis,
+    idAttribute=None,
+    jsonBackend="json",
+    copy=None,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert ArcGIS JSON to GeoJSON. A str is parsed and the result serialised
+    back to str, bytes are parsed and serialised back to UTF-8 bytes, and
+    anything else is converted as a python object (see convert() for the
+    other arguments).
+    """
+
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=copy,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+
+    if not isinstance(arcgis, (str, bytes, bytearray, memoryview)):
+        with _stage("convert"):
+            return _convert(arcgis, options)
+
+    backend = get_json_backend(jsonBackend)
+    with _stage("parse"):
+        parsed = backend.loads(arcgis)
+    # nothing else can see an object we parsed, so it is never copied. it is
+    # all serialised, so there's nothing to gain from converting it lazily
+    with _stage("convert"):
+        geojson = _convert(parsed, options._replace(copy=False, lazy=False))
+    with _stage("serialise"):
+        dumps = backend.dumps if isinstance(arcgis, str) else backend.dumpb
+        if compact:
+            return _geojsonEncoder(dumps)(geojson)
+        return dumps(geojson)
+
+
+def convert(
+    arcgis,
+    idAttribute=None,
+    copy=None,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert an ArcGIS JSON object to a GeoJSON object
+
+    copy controls whether the output shares data with the input:
+    None (default): the input is not modified, but coordinates and
+        properties in the output may be the same objects as in the input
+    True: the input is not modified and the output shares nothing with it
+    False: nothing is copied that doesn't have to be. polygon rings are
+        closed and rewound in place, modifying the input
+
+    If reproject is True, geometries in a spatial reference other than WGS84
+    are reprojected to it, using the spatialReference of the geometry or
+    else of the layer it belongs to. Web Mercator is reprojected directly,
+    anything else needs pyproj to be installed. Geometries that can't be
+    reprojected are converted as they are, with a warning.
+
+    If precision is set, coordinates are rounded to that many decimal places
+    as they are copied to the output. With dedupe, consecutive vertices of a
+    line or ring made equal by the rounding are then removed (unless that
+    would leave too few for a valid line or ring).
+
+    If simplify is set, polylines and polygon rings are simplified with the
+    Douglas-Peucker algorithm, dropping vertices less than this distance (in
+    the units of the input coordinates) from the simplified line. A ring is
+    left as it was if simplifying it would leave too few vertices or reverse
+    its orientation. Holes are matched to outer rings first, and a hole
+    that would no longer be inside its simplified outer ring is kept as it
+    was, or if that doesn't fit either, the outer ring is.
+
+    If cache is a ConversionCache, converted geometries are looked up in it
+    and added to it.
+
+    If compact is True, geometries are returned as CompactGeometry objects,
+    with their positions packed into an array('d') rather than nested lists
+    (coordinates are then always floats). Geometries whose positions can't
+    be packed are returned as dicts.
+
+    If lazy is True, features are returned as LazyFeature objects, whose
+    properties and id are set straight away but whose geometry is only
+    converted when it is first used.
+
+    fields picks the attributes kept as properties: a list of names, of
+    (name, newName) pairs or a mix of both, or a dict of name: newName.
+    Feature ids are still read from all the attributes.
+
+    If where is set, it is called with the attributes of each feature of a
+    FeatureCollection and only features it returns True for are converted.
+    If bbox is set to (xmin, ymin, xmax, ymax), in the coordinates of the
+    input, only features whose geometry's bounding box intersects it are
+    converted. Both are tested before the feature is converted, and
+    features without a geometry never intersect a bbox. A where predicate
+    passed to convert_parallel() must be picklable.
+
+    If geometry is False, features are converted with a null geometry,
+    without reading theirs.
+    """
+
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=copy,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    with _stage("convert"):
+        return _convert(arcgis, options)
+
+
+def convert_pbf(
+    data,
+    idAttribute=None,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert an ArcGIS FeatureCollection PBF buffer (the response to a query
+    with f=pbf) to a GeoJSON object. See convert() for the other arguments.
+    """
+
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=False,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    with _stage("decode"):
+        arcgis = pbf.decode(data)
+    with _stage("convert"):
+        return _convert(arcgis, options)
+
+
+# the magic bytes starting, and file extension of, each compressed format
+COMPRESSIONS = {
+    "gzip": (b"\x1f\x8b", ".gz"),
+    "zstd": (b"\x28\xb5\x2f\xfd", ".zst"),
+}
+
+
+def _zstd():
+    """
+    the zstd module from the standard library (python 3.14+), or else the
+    zstandard package
+    """
+    for name in ("compression.zstd", "zstandard"):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    raise ImportError("zstd compression needs python 3.14+ or zstandard")
+
+
+def _compression(fp):
+    """
+    the compression of a binary file object, judged by its first bytes if
+    they can be looked at without consuming them, otherwise by its name
+    """
+
+    if hasattr(fp, "peek"):
+        head = fp.peek(4)[:4]
+    elif fp.seekable():
+        position = fp.tell()
+        head = fp.read(4)
+        fp.seek(position)
+    else:
+        name = getattr(fp, "name", None)
+        if not isinstance(name, str):
+            return None
+        for compression, (_, extension) in COMPRESSIONS.items():
+            if name.endswith(extension):
+                return compression
+        return None
+
+    for compression, (magic, _) in COMPRESSIONS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+@contextmanager
+def _decompressed(fp):
+    """
+    wrap a binary file object that is gzip or zstd compressed so that it is
+    decompressed as it is read. anything else is yielded as it is
+    """
+
+    compression = None if isinstance(fp, io.TextIOBase) else _compression(fp)
+    if compression is None:
+        yield fp
+    elif compression == "gzip":
+        with gzip.GzipFile(fileobj=fp, mode="rb") as stream:
+            yield stream
+    else:
+        zstd = _zstd()
+        if zstd.__name__ == "compression.zstd":
+            stream = zstd.ZstdFile(fp, mode="rb")
+        else:
+            stream = zstd.ZstdDecompressor().stream_reader(
+                fp, read_across_frames=True, closefd=False
+            )
+        with stream:
+            yield stream
+
+
+@contextmanager
+def _compressed(fp, compression):
+    """
+    wrap a binary file object so that what is written to it is compressed
+    with compression (one of COMPRESSIONS, or None for no compression) as
+    it is written
+    """
+
+    if compression is None:
+        yield fp
+        return
+    if compression == "gzip":
+        stream = gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=fp)
+    else:
+        zstd = _zstd()
+        if zstd.__name__ == "compression.zstd":
+            stream = zstd.ZstdFile(fp, mode="wb")
+        else:
+            writer = zstd.ZstdCompressor().stream_writer(fp, closefd=False)
+            stream = io.BufferedWriter(_RawWriter(writer))
+    # closing the stream ends the compressed stream, but leaves fp open
+    with stream:
+        yield stream
+
+
+class _RawWriter(io.RawIOBase):
+    # gives a writer that isn't an io.IOBase (zstandard's stream_writer) the
+    # binary file object interface the writers look for
+    def __init__(self, writer):
+        self.writer = writer
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.writer.write(b)
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self.writer.close()
+        super().close()
+
+
+@contextmanager
+def _mapped(fp):
+    """
+    map a binary file into memory, so it can be parsed without first being
+    read into a copy. yields None if it can't be mapped, e.g. if it is a
+    pipe, empty, or already partly read
+    """
+
+    # only plain files: e.g. a GzipFile has the fileno of the compressed file
+    mappable = isinstance(fp, (io.FileIO, io.BufferedReader, io.BufferedRandom))
+    try:
+        mapped = (
+            mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            if mappable and fp.seekable() and fp.tell() == 0
+            else None
+        )
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        mapped = None
+    if mapped is None:
+        yield None
+        return
+    try:
+        yield mapped
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            # still exported, e.g. by a traceback. unmapped when collected
+            pass
+
+
+def _loadsMapped(backend, data):
+    # orjson parses the mapping itself, the others need it decoded to str
+    if backend.name == "orjson":
+        with memoryview(data) as view:
+            return backend.loads(view)
+    return backend.loads(str(data, "utf-8-sig"))
+
+
+def _readArcGIS(fp, inputFormat, backend):
+    """
+    parse (or for pbf, decode) the whole of a file object, memory mapping
+    it if we can
+    """
+
+    with _mapped(fp) as mapped:
+        if mapped is None:
+            with _stage("read"):
+                data = fp.read()
+        else:
+            data = mapped
+        if inputFormat == "pbf":
+            with _stage("decode"):
+                return pbf.decode(data)
+        with _stage("parse"):
+            if mapped is None:
+                return backend.loads(data)
+            return _loadsMapped(backend, mapped)
+
+
+def load(
+    path,
+    idAttribute=None,
+    jsonBackend="json",
+    inputFormat="json",
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Read ArcGIS JSON (or with inputFormat="pbf", an ArcGIS FeatureCollection
+    PBF buffer) from a file and convert it to a GeoJSON object. The file is
+    memory mapped rather than read into a copy: PBF is decoded and, with
+    the orjson backend, JSON is parsed straight from the mapping, while
+    other backends parse it decoded to str. See convert() for the other
+    arguments.
+    """
+
+    if inputFormat not in INPUT_FORMATS:
+        raise ValueError(f"Unknown input format '{inputFormat}'")
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=False,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    with open(path, "rb") as fp, _decompressed(fp) as stream:
+        arcgis = _readArcGIS(stream, inputFormat, get_json_backend(jsonBackend))
+    with _stage("convert"):
+        return _convert(arcgis, options)
+
+
+# spatialReference is the layer's, inherited by geometries without their own
+_Options = namedtuple(
+    "_Options",
+    [
+        "idAttribute",
+        "copy",
+        "reproject",
+        "spatialReference",
+        "precision",
+        "dedupe",
+        "simplify",
+        "cache",
+        "compact",
+        "lazy",
+        "fields",
+        "where",
+        "bbox",
+        "geometry",
+    ],
+    defaults=(
+        False,
+        None,
+        None,
+        False,
+        None,
+        None,
+        False,
+        False,
+        None,
+        None,
+        None,
+        True,
+    ),
+)
+
+
+def _buildOptions(
+    *,
+    idAttribute=None,
+    copy=None,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    build the _Options for a conversion from the arguments of the public
+    API (see convert()). fields are normalised to (name, newName) pairs
+    """
+    if fields is not None:
+        if isinstance(fields, dict):
+            fields = fields.items()
+        fields = tuple(
+            (field, field) if isinstance(field, str) else tuple(field)
+            for field in fields
+        )
+    if bbox is not None:
+        bbox = tuple(bbox)
+        if len(bbox) != 4:
+            raise ValueError("bbox must be (xmin, ymin, xmax, ymax)")
+    return _Options(
+        idAttribute=idAttribute,
+        copy=copy,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+
+
+_numberTypes = frozenset([int, float])
+_scalarTypes = frozenset([int, float, str, bool, type(None)])
+
+
+def _isNumber(value):
+    # skip the (slow) ABC check for the types json parsers produce
+    return type(value) in _numberTypes or isinstance(value, numbers.Number)
+
+
+def _checkSpatialReference(arcgis, warned=None, reproject=False):
+    """
+    warn if an object is in a crs other than WGS84 (and isn't being
+    reprojected from it). if warned is a set, each distinct spatial
+    reference is only warned about once
+    """
+    if (
+        "spatialReference" in arcgis
+        and "wkid" in arcgis["spatialReference"]
+        and arcgis["spatialReference"]["wkid"] != 4326
+    ):
+        if reproject and _spatialReferenceTransform(arcgis["spatialReference"]):
+            return
+        spatialReference = str(arcgis["spatialReference"])
+        if warned is not None:
+            if spatialReference in warned:
+                return
+            warned.add(spatialReference)
+        logger.warning("Object converted in non-standard crs - " + spatialReference)
+
+
+def _dequantizer(layer):
+    """
+    get a function decoding the quantized geometries of a layer (a query
+    with quantizationParameters, or f=pbf) using its transform. x and y are
+    integers counted in scale sized steps from translate, and every vertex
+    of a path, ring or multipoint but the first is stored as the offset from
+    the one before it. z and m are scaled and translated, if the transform
+    has values for them, but not offset
+    """
+
+    transform = layer["transform"]
+    scale, translate = transform["scale"], transform["translate"]
+    xScale, yScale = scale[0], scale[1]
+    xTranslate, yTranslate = translate[0], translate[1]
+    if transform.get("originPosition", "upperLeft") == "upperLeft":
+        # y is counted down from the top
+        yScale = -yScale
+
+    # (key in a point, index in a position, scale, translate)
+    extras = []
+    hasZ = bool(layer.get("hasZ"))
+    if hasZ and len(scale) > 2:
+        extras.append(("z", 2, scale[2], translate[2]))
+    if layer.get("hasM") and len(scale) > 3:
+        extras.append(("m", 2 + hasZ, scale[3], translate[3]))
+
+    def dequantizePath(path):
+        x = y = 0
+        decoded = []
+        for position in path:
+            x += position[0]
+            y += position[1]
+            vertex = [xTranslate + x * xScale, yTranslate + y * yScale, *position[2:]]
+            for _, index, extraScale, extraTranslate in extras:
+                if index < len(vertex) and _isNumber(vertex[index]):
+                    vertex[index] = extraTranslate + vertex[index] * extraScale
+            decoded.append(vertex)
+        return decoded
+
+    def dequantize(geometry):
+        geometry = dict(geometry)
+        if _isNumber(geometry.get("x")) and _isNumber(geometry.get("y")):
+            geometry["x"] = xTranslate + geometry["x"] * xScale
+            geometry["y"] = yTranslate + geometry["y"] * yScale
+            for key, _, extraScale, extraTranslate in extras:
+                if _isNumber(geometry.get(key)):
+                    geometry[key] = extraTranslate + geometry[key] * extraScale
+        if "points" in geometry:
+            geometry["points"] = dequantizePath(geometry["points"])
+        for key in ("paths", "rings"):
+            if key in geometry:
+                geometry[key] = [dequantizePath(path) for path in geometry[key]]
+        if all(_isNumber(geometry.get(key)) for key in _envelopeKeys):
+            xs = [xTranslate + geometry[key] * xScale for key in ("xmin", "xmax")]
+            ys = [yTranslate + geometry[key] * yScale for key in ("ymin", "ymax")]
+            geometry["xmin"], geometry["xmax"] = min(xs), max(xs)
+            geometry["ymin"], geometry["ymax"] = min(ys), max(ys)
+        return geometry
+
+    return dequantize
+
+
+_envelopeKeys = ("xmin", "ymin", "xmax", "ymax")
+
+
+def _geometryEnvelope(arcgis):
+    """
+    get the bounding box of an ArcGIS geometry as (xmin, ymin, xmax, ymax),
+    or None if it has no coordinates. true curves are bounded by their
+    vertices
+    """
+    if "x" in arcgis:
+        x, y = arcgis["x"], arcgis.get("y")
+        return (x, y, x, y) if _isNumber(x) and _isNumber(y) else None
+    if "xmin" in arcgis:
+        envelope = tuple(arcgis.get(key) for key in _envelopeKeys)
+        return envelope if all(map(_isNumber, envelope)) else None
+    parts = arcgis.get("rings") or arcgis.get("paths") or [arcgis.get("points")]
+    for key in ("curveRings", "curvePaths"):
+        # a curve segment is a dict whose value starts with its end point
+        parts = parts + [
+            [
+                next(iter(vertex.values()))[0] if isinstance(vertex, dict) else vertex
+                for vertex in part
+            ]
+            for part in arcgis.get(key) or []
+        ]
+    envelopes = [ringEnvelope(part) for part in parts if part]
+    if len(envelopes) < 2:
+        return envelopes[0] if envelopes else None
+    xmins, ymins, xmaxs, ymaxs = zip(*envelopes)
+    return (min(xmins), min(ymins), max(xmaxs), max(ymaxs))
+
+
+def _layerFeatureConverter(layer, options):
+    """
+    get a function converting the features of a layer (a FeatureCollection
+    or query response). rather than classifying each geometry, they are all
+    converted with the converter for the layer's geometryType, and each
+    non-standard crs is only warned about once per layer. quantized
+    geometries are decoded with the layer's transform. features left out by
+    the where predicate or bbox of options are converted to None
+    """
+
+    converter, key = _geometryTypes.get(layer.get("geometryType"), (None, None))
+    dequantize = _dequantizer(layer) if "transform" in layer else None
+    if options.reproject and "spatialReference" in layer:
+        options = options._replace(spatialReference=layer["spatialReference"])
+    # the layer's own spatialReference is warned about by the layer itself
+    warned = set()
+    if "spatialReference" in layer:
+        warned.add(str(layer["spatialReference"]))
+
+    def convertLayerGeometry(geometry, geometryOptions):
+        if converter is None or key not in geometry:
+            return _convert(geometry, geometryOptions, warned)
+        geojson = _convertGeometry(converter, geometry, geometryOptions)
+        _checkSpatialReference(geometry, warned, geometryOptions.reproject)
+        return geojson
+
+    def convertDecoded(geometry, geometryOptions):
+        # nothing else can see the decoded geometry
+        return convertLayerGeometry(geometry, geometryOptions._replace(copy=False))
+
+    def convertGeometry(geometry, geometryOptions):
+        if dequantize is not None:
+            return convertDecoded(dequantize(geometry), geometryOptions)
+        return convertLayerGeometry(geometry, geometryOptions)
+
+    def skip():
+        stats = _stats.get()
+        if stats is not None:
+            stats.count("features skipped")
+
+    def convertFeature(feature):
+        # without a geometryType, features might not be features at all, and
+        # neither might anything with neither a geometry nor attributes
+        if (
+            converter is None
+            or ("geometry" not in feature and "attributes" not in feature)
+        ) and _classify(feature) is not _convertFeature:
+            return _convert(feature, options, warned)
+        convert = convertGeometry
+        # features are filtered before anything of them is converted
+        if options.where is not None and not options.where(
+            feature.get("attributes") or {}
+        ):
+            return skip()
+        if options.bbox is not None:
+            geometry = feature.get("geometry")
+            if geometry and dequantize is not None:
+                # decoded once, for the test and the conversion
+                geometry = dequantize(geometry)
+                feature = {**feature, "geometry": geometry}
+                convert = convertDecoded
+            envelope = _geometryEnvelope(geometry) if geometry else None
+            if envelope is None or not envelopesIntersect(envelope, options.bbox):
+                return skip()
+        geojson = _convertFeature(feature, options, convert)
+        _checkSpatialReference(feature, warned, options.reproject)
+        return geojson
+
+    return convertFeature
+
+
+def _convertFeatures(convertFeature, features):
+    # drop the features left out by convertFeature
+    for feature in features:
+        geojson = convertFeature(feature)
+        if geojson is not None:
+            yield geojson
+
+
+def _convertFeatureCollection(arcgis, options):
+    geojson = {}
+    if arcgis["features"]:
+        convertFeature = _layerFeatureConverter(arcgis, options)
+        geojson["type"] = "FeatureCollection"
+        geojson["features"] = list(_convertFeatures(convertFeature, arcgis["features"]))
+        stats = _stats.get()
+        if stats is not None:
+            stats.count("features", len(arcgis["features"]))
+    return geojson
+
+
+def _countVertices(parts=(), n=0):
+    # counted as given, before anything is simplified, rounded or closed
+    stats = _stats.get()
+    if stats is not None:
+        stats.count("vertices", n + sum(map(len, parts)))
+
+
+def _convertPoint(arcgis, options):
+    geojson = {}
+    if _isNumber(arcgis["x"]) and _isNumber(arcgis.get("y")):
+        _countVertices(n=1)
+        geojson["type"] = "Point"
+        geojson["coordinates"] = [arcgis["x"], arcgis["y"]]
+        if "z" in arcgis and _isNumber(arcgis["z"]):
+            geojson["coordinates"].append(arcgis["z"])
+        if options.precision is not None:
+            geojson["coordinates"] = roundPosition(
+                geojson["coordinates"], options.precision
+            )
+    return geojson
+
+
+def _convertMultipoint(arcgis, options):
+    points = arcgis["points"]
+    _countVertices([points])
+    if options.precision is not None:
+        points = roundPositions(points, options.precision)
+    elif options.copy:
+        points = copyCoordinates(points, 1)
+    geojson = {"type": "MultiPoint", "coordinates": points}
+    return geojson
+
+
+def _roundedParts(parts, options, minLength):
+    # parts are rounded as they are copied, so need no other copy
+    minLength = minLength if options.dedupe else None
+    return [roundPositions(part, options.precision, minLength) for part in parts]
+
+
+def _convertPolyline(arcgis, options):
+    paths = arcgis["paths"]
+    _countVertices(paths)
+    if options.simplify:
+        # positions are still shared with the input
+        paths = [simplifyPositions(path, options.simplify) for path in paths]
+    if options.precision is not None:
+        paths = _roundedParts(paths, options, 2)
+    elif options.copy:
+        paths = copyCoordinates(paths, 2)
+    if len(paths) == 1:
+        geojson = {"type": "LineString", "coordinates": paths[0]}
+    else:
+        geojson = {"type": "MultiLineString", "coordinates": paths}
+    return geojson
+
+
+def _convertPolygon(arcgis, options):
+    rings = arcgis["rings"]
+    _countVertices(rings)
+    if options.simplify:
+        return _convertSimplifiedPolygon(rings, options)
+    if options.precision is not None:
+        rings = _roundedParts(rings, options, 4)
+        return convertRingsToGeoJSON(rings, False)
+    geojson = convertRingsToGeoJSON(rings, options.copy)
+    return geojson
+
+
+def _convertSimplifiedPolygon(rings, options):
+    # holes are matched to outer rings before they are simplified, so they
+    # can be kept inside the outer ring they were matched to
+    geojson = convertRingsToGeoJSON(rings, options.copy)
+    polygons = geojson["coordinates"]
+    if geojson["type"] == "Polygon":
+        polygons = [polygons]
+    polygons = [simplifyPolygon(polygon, options.simplify) for polygon in polygons]
+    if options.precision is not None:
+        polygons = [_roundedParts(polygon, options, 4) for polygon in polygons]
+    geojson["coordinates"] = polygons[0] if geojson["type"] == "Polygon" else polygons
+    return geojson
+
+
+def _convertEnvelope(arcgis, options):
+    geojson = {}
+    if (
+        _isNumber(arcgis["xmin"])
+        and _isNumber(arcgis.get("ymin"))
+        and _isNumber(arcgis.get("xmax"))
+        and _isNumber(arcgis.get("ymax"))
+    ):
+        # the corners of the ring, before it is closed
+        _countVertices(n=4)
+        geojson["type"] = "Polygon"
+        geojson["coordinates"] = [
+            [
+                [arcgis["xmax"], arcgis["ymax"]],
+                [arcgis["xmin"], arcgis["ymax"]],
+                [arcgis["xmin"], arcgis["ymin"]],
+                [arcgis["xmax"], arcgis["ymin"]],
+                [arcgis["xmax"], arcgis["ymax"]],
+            ]
+        ]
+        if options.precision is not None:
+            geojson["coordinates"] = _roundedParts(geojson["coordinates"], options, 4)
+    return geojson
+
+
+def _convertFeatureGeometry(geometry, options, convertGeometry=None):
+    if not geometry:
+        return None
+    # idAttribute only applies to the feature itself
+    if options.idAttribute is not None:
+        options = options._replace(idAttribute=None)
+    return (convertGeometry or _convert)(geometry, options) or None
+
+
+def _convertFeature(arcgis, options, convertGeometry=None):
+    geometry = arcgis.get("geometry") if options.geometry else None
+
+    featureId = _noId
+    if "attributes" in arcgis:
+        attributes = arcgis["attributes"]
+        properties = attributes
+        if options.fields is not None and attributes is not None:
+            properties = {
+                newName: attributes[name]
+                for name, newName in options.fields
+                if name in attributes
+            }
+        if options.copy and attributes is not None:
+            # values are nearly always scalars, which needn't be copied
+            properties = {
+                key: value if type(value) in _scalarTypes else deepcopy(value)
+                for key, value in properties.items()
+            }
+        try:
+            featureId = getId(attributes, options.idAttribute)
+        except KeyError:
+            # don't set an id
+            pass
+    else:
+        properties = None
+
+    if options.lazy:
+        return LazyFeature(
+            (
+                partial(_convertFeatureGeometry, geometry, options, convertGeometry)
+                if geometry
+                else None
+            ),
+            properties,
+            featureId,
+        )
+
+    geojson = {
+        "type": "Feature",
+        "geometry": _convertFeatureGeometry(geometry, options, convertGeometry),
+        "properties": properties,
+    }
+    if featureId is not _noId:
+        geojson["id"] = featureId
+    return geojson
+
+
+def _convertAny(arcgis, options, warned=None):
+    """
+    convert an object that doesn't look like exactly one kind of ArcGIS
+    object, or contains true curves. later matches take precedence
+    """
+
+    geojson = {}
+
+    if "features" in arcgis and arcgis["features"]:
+        geojson.update(_convertFeatureCollection(arcgis, options))
+
+    if "x" in arcgis and "y" in arcgis:
+        geojson.update(_convertPoint(arcgis, options))
+
+    if "points" in arcgis:
+        geojson.update(_convertMultipoint(arcgis, options))
+
+    if "paths" in arcgis:
+        geojson.update(_convertPolyline(arcgis, options))
+
+    if "rings" in arcgis:
+        geojson = _convertPolygon(arcgis, options)
+
+    if all(key in arcgis for key in ("xmin", "ymin", "xmax", "ymax")):
+        geojson.update(_convertEnvelope(arcgis, options))
+
+    if "geometry" in arcgis or "attributes" in arcgis:
+        geojson.update(_convertFeature(arcgis, options))
+
+    if "geometry" in geojson and not (geojson["geometry"]):
+        geojson["geometry"] = None
+
+    _checkSpatialReference(arcgis, warned, options.reproject)
+
+    trueCurveElements = {
+        "curveRings": "Curved Polygon",
+        "curvePaths": "Curved Polyline",
+        "a": "Elliptic Arc",
+        "b": "Bézier Curve",
+        "c": "Circular Arc",
+    }
+    for k, v in trueCurveElements.items():
+        if k in arcgis:
+            logger.warning(
+                f"Element of type '{k}' ({v}) can not be convered to GeoJSON. Converting to null geometry"
+            )
+            geojson["geometry"] = None
+
+    return geojson
+
+
+# keys that decide what kind of object is being converted
+_shapeKeys = frozenset(
+    [
+        "features",
+        "x",
+        "y",
+        "points",
+        "paths",
+        "rings",
+        "xmin",
+        "ymin",
+        "xmax",
+        "ymax",
+        "geometry",
+        "attributes",
+        "curveRings",
+        "curvePaths",
+        "a",
+        "b",
+        "c",
+    ]
+)
+
+_converters = {
+    frozenset(["geometry", "attributes"]): _convertFeature,
+    frozenset(["geometry"]): _convertFeature,
+    frozenset(["attributes"]): _convertFeature,
+    frozenset(["x", "y"]): _convertPoint,
+    frozenset(["points"]): _convertMultipoint,
+    frozenset(["paths"]): _convertPolyline,
+    frozenset(["rings"]): _convertPolygon,
+    frozenset(["xmin", "ymin", "xmax", "ymax"]): _convertEnvelope,
+    frozenset(["features"]): _convertFeatureCollection,
+}
+
+
+# converters for each layer geometryType, and the key they expect
+_geometryTypes = {
+    "esriGeometryPoint": (_convertPoint, "x"),
+    "esriGeometryMultipoint": (_convertMultipoint, "points"),
+    "esriGeometryPolyline": (_convertPolyline, "paths"),
+    "esriGeometryPolygon": (_convertPolygon, "rings"),
+    "esriGeometryEnvelope": (_convertEnvelope, "xmin"),
+}
+
+
+_geometryConverters = frozenset(converter for converter, _ in _geometryTypes.values())
+
+
+# points and envelopes are quicker to convert than to look up
+_cachedConverters = frozenset([_convertMultipoint, _convertPolyline, _convertPolygon])
+
+
+def _classify(arcgis):
+    return _converters.get(frozenset(_shapeKeys.intersection(arcgis)))
+
+
+def _convert(arcgis, options, warned=None):
+    """
+    classify an object by the keys it has and hand it to the converter for
+    that kind of object
+    """
+
+    converter = _classify(arcgis)
+    if converter is None:
+        if options.reproject:
+            return _convertReprojected(
+                lambda arcgis, options: _convertAny(arcgis, options, warned),
+                arcgis,
+                options,
+            )
+        return _convertAny(arcgis, options, warned)
+
+    geojson = _convertGeometry(converter, arcgis, options)
+    _checkSpatialReference(arcgis, warned, options.reproject)
+    return geojson
+
+
+def _convertGeometry(converter, arcgis, options):
+    """
+    convert an object with its converter, going through the cache and
+    reprojecting the geometry if asked to
+    """
+    if options.cache is not None and converter in _cachedConverters:
+        geojson = options.cache.convert(_convertUncached, converter, arcgis, options)
+    else:
+        geojson = _convertUncached(converter, arcgis, options)
+    if options.compact and converter in _geometryConverters:
+        return _compactGeometry(geojson)
+    return geojson
+
+
+def _convertUncached(converter, arcgis, options):
+    if options.reproject:
+        return _convertReprojected(converter, arcgis, options)
+    return converter(arcgis, options)
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _convertChunk(features, layer, options, geometryBackend, collectStats=False):
+    """
+    convert a chunk of a layer's features in a worker process. log records are
+    captured and returned rather than emitted so the parent can re-log them,
+    as are the worker's stats if collectStats
+    """
+    set_geometry_backend(geometryBackend)
+    handler = _RecordingHandler()
+    propagate = logger.propagate
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        convertFeature = _layerFeatureConverter(layer, options)
+        if not collectStats:
+            converted = list(_convertFeatures(convertFeature, features))
+            return converted, handler.records, None
+        with collect_stats() as stats:
+            # summed over workers, so more than the time convert_parallel took
+            with _stage("worker convert"):
+                converted = list(_convertFeatures(convertFeature, features))
+            stats.count("features", len(features))
+        return converted, handler.records, (stats.timings, stats.counters)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = propagate
+
+
+def convert_parallel(
+    arcgis,
+    idAttribute=None,
+    workers=None,
+    chunksize=1000,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert an ArcGIS JSON object to a GeoJSON object, sharding the features
+    of a FeatureCollection across a pool of worker processes, chunksize
+    features at a time. Feature order is preserved and warnings logged by
+    the workers are re-logged here. See convert() for the other arguments.
+    """
+
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be at least 1, not {workers}")
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, not {chunksize}")
+
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=False,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    if not ("features" in arcgis and arcgis["features"]):
+        return _convert(arcgis, options._replace(copy=None))
+
+    features = arcgis["features"]
+    bounds = range(0, len(features) + chunksize, chunksize)
+    chunks = [features[start:end] for start, end in zip(bounds, bounds[1:])]
+
+    # workers only need the layer's declarations
+    layer = {
+        key: arcgis[key]
+        for key in ("geometryType", "spatialReference", "transform", "hasZ", "hasM")
+        if key in arcgis
+    }
+
+    # imported here, as it is slow to import and most callers never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    geojson = {"type": "FeatureCollection", "features": []}
+    crsWarnings = set()
+    stats = _stats.get()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for converted, records, workerStats in executor.map(
+            _convertChunk,
+            chunks,
+            repeat(layer),
+            repeat(options),
+            repeat(_geometryBackend),
+            repeat(stats is not None),
+        ):
+            # the workers' timings add up to more than the wall clock time
+            if workerStats is not None:
+                stats.merge(*workerStats)
+            for record in records:
+                # each worker warns about a crs once, the layer should too
+                message = record.getMessage()
+                if message.startswith("Object converted in non-standard crs"):
+                    if message in crsWarnings:
+                        continue
+                    crsWarnings.add(message)
+                logger.handle(record)
+            geojson["features"].extend(converted)
+
+    # anything else at the top level is converted as convert() would
+    geojson.update(_convert({**arcgis, "features": []}, options._replace(copy=None)))
+    return geojson
+
+
+_jsonDecoder = json.JSONDecoder()
+_delimiters = " \t\n\r,:]}"
+
+
+class _StreamReader:
+    """
+    minimal incremental reader used to walk the top level of a JSON document
+    held in a (text or binary) file object, decoding one value at a time
+    """
+
+    def __init__(self, fp, readSize):
+        self.fp = fp
+        self.readSize = readSize
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = None
+
+    def fill(self, size=None):
+        chunk = self.fp.read(size or self.readSize)
+        if not chunk:
+            self.eof = True
+        if isinstance(chunk, (bytes, bytearray)):
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+            chunk = self.decoder.decode(chunk, final=self.eof)
+        start = self.pos
+        self.buf = self.buf[start:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                break
+            self.fill()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def consume(self, expected):
+        char = self.peek()
+        if not char or char not in expected:
+            raise json.JSONDecodeError(
+                f"Expecting one of {expected!r}", self.buf, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _jsonDecoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                value, end = None, None
+            # a value must be followed by a delimiter, otherwise it may have
+            # been truncated at the end of the buffer (e.g. a number)
+            if end is not None and (
+                self.eof or (end < len(self.buf) and self.buf[end] in _delimiters)
+            ):
+                self.pos = end
+                return value
+            self.fill(max(self.readSize, len(self.buf) - self.pos))
+
+
+def iter_convert(
+    fp,
+    idAttribute=None,
+    readSize=65536,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    lazy=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Incrementally convert an ArcGIS JSON document read from a file object,
+    yielding one GeoJSON Feature at a time. Only a single feature is held in
+    memory at once. A geometryType, spatialReference or (quantization)
+    transform declared before the features array is used for the whole
+    layer, as in convert() (which also describes the other arguments). If
+    the document has no features array, the whole object is converted and
+    yielded instead, unless it converts to nothing (e.g. {}). fp is read
+    readSize characters (or bytes) at a time.
+    """
+
+    if readSize < 1:
+        raise ValueError(f"readSize must be at least 1, not {readSize}")
+    reader = _StreamReader(fp, readSize)
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=False,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        lazy=lazy,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    layer = {}
+    hasFeatures = False
+    # reading and converting are interleaved, so are timed a value at a time
+    decode = _timed(reader.decode, "parse")
+
+    reader.consume("{")
+    if reader.peek() == "}":
+        reader.consume("}")
+    else:
+        while True:
+            key = decode()
+            reader.consume(":")
+            if key == "features" and reader.peek() == "[":
+                hasFeatures = True
+                reader.consume("[")
+                if reader.peek() == "]":
+                    reader.consume("]")
+                else:
+                    convertFeature = _timed(
+                        _layerFeatureConverter(layer, options), "convert"
+                    )
+                    while True:
+                        geojson = convertFeature(decode())
+                        if geojson is not None:
+                            yield geojson
+                        stats = _stats.get()
+                        if stats is not None:
+                            stats.count("features")
+                        if reader.consume(",]") == "]":
+                            break
+            else:
+                layer[key] = decode()
+            if reader.consume(",}") == "}":
+                break
+
+    if hasFeatures:
+        _checkSpatialReference(layer, reproject=reproject)
+    else:
+        with _stage("convert"):
+            geojson = _convert(layer, options)
+        # as the output of a non-streamed conversion would be written
+        yield from _features(geojson)
+
+
+def _features(geojson):
+    if geojson.get("type") == "FeatureCollection":
+        return geojson["features"]
+    return [geojson] if geojson else []
+
+
+def _convertPage(page, options, jsonBackend):
+    """
+    convert one page of a paged query, returning its features and whether
+    the server has more
+    """
+    if isinstance(page, (str, bytes, bytearray, memoryview)):
+        with _stage("parse"):
+            page = get_json_backend(jsonBackend).loads(page)
+        options = options._replace(copy=False)
+    with _stage("convert"):
+        geojson = _convert(page, options)
+    return _features(geojson), bool(page.get("exceededTransferLimit"))
+
+
+async def aiter_convert(
+    pages,
+    idAttribute=None,
+    jsonBackend="json",
+    concurrency=4,
+    executor=None,
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert the pages of a paged query (e.g. with resultOffset), read from
+    an async iterable of ArcGIS JSON pages (python objects, str or bytes),
+    yielding GeoJSON Features in order. Up to concurrency pages are
+    converted at once in executor (the event loop's default executor if
+    None), so converting doesn't block the event loop. No more pages are
+    read once a page without exceededTransferLimit has been converted.
+    See convert() for the other arguments.
+    """
+
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, not {concurrency}")
+
+    # imported here, as most callers never need an event loop or processes
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=None,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    source = aiter(pages)
+    pending = deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    page = await anext(source)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                if isinstance(executor, ProcessPoolExecutor):
+                    convertPage = _convertPage
+                else:
+                    # so stats collected around the loop see each page
+                    convertPage = partial(contextvars.copy_context().run, _convertPage)
+                pending.append(
+                    loop.run_in_executor(
+                        executor, convertPage, page, options, jsonBackend
+                    )
+                )
+                # a parsed page tells us if it's the last one straight away
+                if isinstance(page, dict) and not page.get("exceededTransferLimit"):
+                    exhausted = True
+            if not pending:
+                break
+
+            features, more = await pending.popleft()
+            for feature in features:
+                yield feature
+            if not more:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        if hasattr(source, "aclose"):
+            await source.aclose()
+
+
+def _isBinary(fp):
+    # anything that can't be told apart is written str, as it always was
+    if isinstance(fp, io.TextIOBase):
+        return False
+    mode = getattr(fp, "mode", None)
+    return isinstance(fp, (io.RawIOBase, io.BufferedIOBase)) or (
+        isinstance(mode, str) and "b" in mode
+    )
+
+
+def _dumpsFor(fp, jsonBackend):
+    """
+    get the dumps of a JSON backend that writes what fp takes: UTF-8 bytes
+    straight from the backend for a binary file object, str otherwise
+    """
+    backend = get_json_backend(jsonBackend)
+    return backend.dumpb if _isBinary(fp) else backend.dumps
+
+
+def write_feature_collection(features, fp, jsonBackend="json"):
+    """
+    Write an iterable of GeoJSON Features to a text or binary file object as
+    a FeatureCollection, serialising each feature as it is consumed
+    """
+
+    dumps = _dumpsFor(fp, jsonBackend)
+    encode = _geojsonEncoder(dumps)
+    separator = _separators(dumps)[0]
+    # the FeatureCollection around the features is written by the backend
+    wrapper = encode({"type": "FeatureCollection", "features": []})
+    if isinstance(wrapper, bytes):
+        separator = separator.encode("utf-8")
+    fp.write(wrapper[:-2])
+    encode = _timed(encode, "serialise")
+    for i, feature in enumerate(features):
+        if i:
+            fp.write(separator)
+        fp.write(encode(feature))
+    fp.write(wrapper[-2:])
+
+
+def _writeLines(features, fp, prefix, jsonBackend):
+    encode = _timed(_geojsonEncoder(_dumpsFor(fp, jsonBackend)), "serialise")
+    newline = "\n"
+    if _isBinary(fp):
+        prefix, newline = prefix.encode("utf-8"), b"\n"
+    for feature in features:
+        fp.write(prefix + encode(feature) + newline)
+
+
+def write_ndjson(features, fp, jsonBackend="json"):
+    """
+    Write an iterable of GeoJSON Features to a text or binary file object as
+    newline-delimited JSON, one feature per line as it is consumed
+    """
+    _writeLines(features, fp, "", jsonBackend)
+
+
+def write_geojsonseq(features, fp, jsonBackend="json"):
+    """
+    Write an iterable of GeoJSON Features to a text or binary file object as
+    a GeoJSON Text Sequence (RFC 8142), one record per feature as it is
+    consumed
+    """
+    _writeLines(features, fp, "\x1e", jsonBackend)
+
+
+OUTPUT_FORMATS = {
+    "geojson": write_feature_collection,
+    "ndjson": write_ndjson,
+    "geojsonseq": write_geojsonseq,
+}
+
+
+def _writeConverted(arcgis, options, fp, outputFormat="geojson", jsonBackend="json"):
+    """
+    convert an ArcGIS JSON object and write it to a text or binary file
+    object in one of OUTPUT_FORMATS. the features of a FeatureCollection are converted as
+    they are written, so the output is never held in memory all at once
+    """
+
+    if _classify(arcgis) is not _convertFeatureCollection or not arcgis["features"]:
+        with _stage("convert"):
+            geojson = _convert(arcgis, options)
+        if outputFormat == "geojson":
+            with _stage("serialise"):
+                text = _geojsonEncoder(_dumpsFor(fp, jsonBackend))(geojson)
+            fp.write(text)
+        else:
+            OUTPUT_FORMATS[outputFormat](_features(geojson), fp, jsonBackend)
+        return
+
+    # converting and serialising are interleaved, so are timed a feature at
+    # a time
+    convertFeature = _timed(_layerFeatureConverter(arcgis, options), "convert")
+    OUTPUT_FORMATS[outputFormat](
+        _convertFeatures(convertFeature, arcgis["features"]), fp, jsonBackend
+    )
+    stats = _stats.get()
+    if stats is not None:
+        stats.count("features", len(arcgis["features"]))
+    _checkSpatialReference(arcgis, reproject=options.reproject)
+
+
+def dump(
+    arcgis,
+    fp,
+    idAttribute=None,
+    jsonBackend="json",
+    reproject=False,
+    precision=None,
+    dedupe=False,
+    simplify=None,
+    cache=None,
+    compact=False,
+    fields=None,
+    where=None,
+    bbox=None,
+    geometry=True,
+):
+    """
+    Convert ArcGIS JSON (a python object, or str or bytes to parse) and
+    write it to a text or binary file object as GeoJSON. The features of a
+    FeatureCollection are converted and written one at a time, so neither
+    the converted object nor its serialised form is held in memory all at
+    once. Binary file objects are written the UTF-8 bytes the JSON backend
+    serialises to. See convert() for the other arguments.
+    """
+
+    options = _buildOptions(
+        idAttribute=idAttribute,
+        copy=None,
+        reproject=reproject,
+        precision=precision,
+        dedupe=dedupe,
+        simplify=simplify,
+        cache=cache,
+        compact=compact,
+        fields=fields,
+        where=where,
+        bbox=bbox,
+        geometry=geometry,
+    )
+    if isinstance(arcgis, (str, bytes, bytearray, memoryview)):
+        with _stage("parse"):
+            arcgis = get_json_backend(jsonBackend).loads(arcgis)
+        # nothing else can see an object we parsed, so it is never copied
+        options = options._replace(copy=False)
+
+    _writeConverted(arcgis, options, fp, jsonBackend=jsonBackend)
+
+
+class _AttributesEqual:
+    """
+    a where predicate true of attributes with every (field, value) of
+    conditions. unlike a lambda, it can be sent to worker processes
+    """
+
+    def __init__(self, conditions):
+        self.conditions = tuple(conditions)
+
+    def __call__(self, attributes):
+        return all(
+            field in attributes and attributes[field] == value
+            for field, value in self.conditions
+        )
+
+
+def _fieldsArgument(value):
+    # NAME or NAME:NEWNAME, comma separated
+    return [
+        tuple(field.split(":", 1)) if ":" in field else field
+        for field in value.split(",")
+        if field
+    ]
+
+
+def _whereArgument(value):
+    field, separator, text = value.partition("=")
+    if not field or not separator:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE, got '{value}'")
+    # numbers, true, false and null are compared as JSON values
+    try:
+        return field, json.loads(text)
+    except ValueError:
+        return field, text
+
+
+def _jobsArgument(value):
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(
+            f"expected a whole number of at least 1, got '{value}'"
+        )
+    return jobs
+
+
+def _bboxArgument(value):
+    try:
+        bbox = [float(coordinate) for coordinate in value.split(",")]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4:
+        raise argparse.ArgumentTypeError(f"expected XMIN,YMIN,XMAX,YMAX, got '{value}'")
+    return bbox
+
+
+def _convertInput(src, dst, args):
+    filters = {
+        "fields": args.fields,
+        "where": _AttributesEqual(args.where) if args.where else None,
+        "bbox": args.bbox,
+        "geometry": args.geometry,
+    }
+    streaming = args.output_format != "geojson" and args.input_format != "pbf"
+    if streaming and args.jobs == 1:
+        features = iter_convert(
+            getattr(src, "buffer", src),
+            args.id,
+            reproject=args.reproject,
+            precision=args.precision,
+            dedupe=args.dedupe,
+            simplify=args.simplify,
+            compact=args.compact,
+            **filters,
+        )
+        # reading, converting and writing are interleaved, and timed a
+        # feature at a time
+        OUTPUT_FORMATS[args.output_format](features, dst, args.json_backend)
+        return
+
+    backend = get_json_backend(args.json_backend)
+    # read bytes where we can, to skip decoding text the parser re-encodes
+    arcgis = _readArcGIS(getattr(src, "buffer", src), args.input_format, backend)
+
+    if args.jobs == 1:
+        options = _buildOptions(
+            idAttribute=args.id,
+            copy=False,
+            reproject=args.reproject,
+            precision=args.precision,
+            dedupe=args.dedupe,
+            simplify=args.simplify,
+            compact=args.compact,
+            **filters,
+        )
+        _writeConverted(arcgis, options, dst, args.output_format, args.json_backend)
+        return
+
+    with _stage("convert"):
+        geojson = convert_parallel(
+            arcgis,
+            idAttribute=args.id,
+            workers=args.jobs,
+            reproject=args.reproject,
+            precision=args.precision,
+            dedupe=args.dedupe,
+            simplify=args.simplify,
+            compact=args.compact,
+            **filters,
+        )
+    with _stage("write"):
+        if args.output_format == "geojson" and geojson.get("type") != (
+            "FeatureCollection"
+        ):
+            dst.write(_geojsonEncoder(_dumpsFor(dst, args.json_backend))(geojson))
+        else:
+            # a FeatureCollection is serialised a feature at a time
+            OUTPUT_FORMATS[args.output_format](
+                _features(geojson), dst, args.json_backend
+            )
+
+
+# input formats, and the extension of input files in a directory
+INPUT_FORMATS = {
+    "json": ".json",
+    "pbf": ".pbf",
+}
+
+OUTPUT_SUFFIXES = {
+    "geojson": ".geojson",
+    "ndjson": ".ndjson",
+    "geojsonseq": ".geojsons",
+}
+
+
+def _isPattern(path):
+    return any(char in path for char in "*?[")
+
+
+def _expandPaths(paths, extension):
+    # files in a directory can also be compressed
+    extensions = [extension]
+    extensions.extend(extension + suffix for _, suffix in COMPRESSIONS.values())
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(
+                sorted(
+                    chain.from_iterable(
+                        glob.glob(os.path.join(path, "*" + extension))
+                        for extension in extensions
+                    )
+                )
+            )
+        elif _isPattern(path):
+            expanded.extend(sorted(glob.glob(path)))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def _outputPath(path, args):
+    name = os.path.basename(path)
+    for _, extension in COMPRESSIONS.values():
+        if name.endswith(extension):
+            name = name[: -len(extension)]
+            break
+    stem = os.path.splitext(name)[0]
+    directory = args.output_dir or os.path.dirname(path)
+    suffix = args.suffix or OUTPUT_SUFFIXES[args.output_format]
+    if args.compress and not args.suffix:
+        suffix += COMPRESSIONS[args.compress][1]
+    return os.path.join(directory, stem + suffix)
+
+
+def _outputCollisions(paths, args):
+    """
+    find the paths in a batch whose output path is also the output path of
+    another, returning a dict of path to the (output path, seconds, error,
+    stats) to report for it instead of converting it
+    """
+
+    byOutput = defaultdict(list)
+    for path in paths:
+        outputPath = _outputPath(path, args)
+        byOutput[os.path.abspath(outputPath)].append((path, outputPath))
+    collisions = {}
+    for sources in byOutput.values():
+        if len(sources) < 2:
+            continue
+        for i, (path, outputPath) in enumerate(sources):
+            others = ", ".join(other for j, (other, _) in enumerate(sources) if j != i)
+            error = f"output would also be written from {others}"
+            collisions[path] = (outputPath, 0.0, error, None)
+    return collisions
+
+
+def _convertPath(path, args):
+    """
+    convert one file of a batch, returning (output path, seconds, error,
+    stats), where stats are (timings, counters) with --stats, else None
+    """
+
+    start = time.perf_counter()
+    outputPath = _outputPath(path, args)
+    if os.path.abspath(outputPath) == os.path.abspath(path):
+        return outputPath, 0.0, "output would overwrite input", None
+    # written alongside the output and moved into place once it is complete,
+    # so a failure never leaves a partial output or touches an existing one
+    partialPath = f"{outputPath}.{os.getpid()}.part"
+    created = False
+    try:
+        with collect_stats() if args.stats else nullcontext() as stats:
+            with open(path, "rb") as src, _decompressed(src) as stream:
+                with open(partialPath, "xb") as dst:
+                    created = True
+                    with _compressed(dst, args.compress) as out:
+                        _convertInput(stream, out, args)
+        os.replace(partialPath, outputPath)
+    except Exception as e:
+        if created and os.path.exists(partialPath):
+            os.remove(partialPath)
+        seconds = time.perf_counter() - start
+        return outputPath, seconds, f"{type(e).__name__}: {e}", None
+    if stats is not None:
+        stats = (stats.timings, stats.counters)
+    return outputPath, time.perf_counter() - start, None, stats
+
+
+def _convertBatch(paths, args):
+    """
+    convert each file in paths, reporting progress on stderr. a failure is
+    reported and the batch carries on
+    """
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # files that would overwrite each other's output (a.json and a.json.gz,
+    # say) all fail, rather than whichever is written last winning
+    collisions = _outputCollisions(paths, args)
+    todo = [path for path in paths if path not in collisions]
+    if args.jobs > 1:
+        # with a pool of processes, parallelise over files, not features
+        from concurrent.futures import ProcessPoolExecutor
+
+        fileArgs = argparse.Namespace(**{**vars(args), "jobs": 1})
+        executor = ProcessPoolExecutor(max_workers=args.jobs)
+        results = executor.map(_convertPath, todo, repeat(fileArgs))
+    else:
+        executor = None
+        results = (_convertPath(path, args) for path in todo)
+
+    failures = 0
+    totals = ConversionStats()
+    try:
+        for path in paths:
+            if path in collisions:
+                outputPath, seconds, error, stats = collisions[path]
+            else:
+                outputPath, seconds, error, stats = next(results)
+            if error:
+                failures += 1
+                sys.stderr.write(f"{path}: failed after {seconds:.3f}s - {error}\n")
+            else:
+                sys.stderr.write(f"{path} -> {outputPath} ({seconds:.3f}s)\n")
+            if stats is not None:
+                totals.merge(*stats)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    sys.stderr.write(f"converted {len(paths) - failures} of {len(paths)} files\n")
+    if args.stats:
+        sys.stderr.write(totals.report() + "\n")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ArcGIS JSON to GeoJSON")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="file",
+        help="Input files, directories of input files (.json or .pbf, depending on --input-format) or glob patterns. If empty, stdin is used",
+    )
+    parser.add_argument(
+        "--id",
+        action="store",
+        help="Attribute to use as feature ID",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--reproject",
+        action="store_true",
+        help="Reproject geometries to WGS84. Web Mercator is supported out of the box, other spatial references need pyproj",
+        required=False,
+    )
+    parser.add_argument(
+        "--precision",
+        action="store",
+        help="Round coordinates to this many decimal places",
+        type=int,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="With --precision, remove consecutive vertices made equal by rounding",
+        required=False,
+    )
+    parser.add_argument(
+        "--simplify",
+        action="store",
+        help="Simplify lines and polygons, dropping vertices closer than this to the simplified line (in input coordinate units)",
+        type=float,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Hold converted coordinates in flat arrays rather than lists, using much less memory for large layers (coordinates are written as floats)",
+        required=False,
+    )
+    parser.add_argument(
+        "--fields",
+        action="store",
+        metavar="NAME[:NEWNAME],...",
+        help="Comma separated attributes to keep as properties, each NAME or NAME:NEWNAME to rename it",
+        type=_fieldsArgument,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--where",
+        action="append",
+        metavar="FIELD=VALUE",
+        help="Only convert features with this attribute value (numbers, true, false and null are matched as JSON values). Can be given more than once to match them all",
+        type=_whereArgument,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--bbox",
+        action="store",
+        metavar="XMIN,YMIN,XMAX,YMAX",
+        help="Only convert features whose geometry intersects this bounding box (in input coordinate units)",
+        type=_bboxArgument,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--no-geometry",
+        action="store_false",
+        help="Write features with a null geometry, without converting theirs",
+        dest="geometry",
+        required=False,
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store",
+        help="Number of worker processes to convert features (or, in batch mode, files) with",
+        type=_jobsArgument,
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "--json-backend",
+        action="store",
+        help="JSON library used to parse and serialise (default: json)",
+        choices=("auto",) + JSON_BACKENDS,
+        required=False,
+        default="json",
+    )
+    parser.add_argument(
+        "--input-format",
+        action="store",
+        help="json: ArcGIS JSON, plain or quantized (default), pbf: ArcGIS FeatureCollection protocol buffer (f=pbf)",
+        choices=tuple(INPUT_FORMATS),
+        required=False,
+        default="json",
+    )
+    parser.add_argument(
+        "--output-format",
+        action="store",
+        help="geojson: a single FeatureCollection (default), ndjson: one feature per line, geojsonseq: RFC 8142 GeoJSON Text Sequence",
+        choices=tuple(OUTPUT_FORMATS),
+        required=False,
+        default="geojson",
+    )
+    parser.add_argument(
+        "--output-dir",
+        action="store",
+        help="Convert in batch mode, writing one output file per input to this directory",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--suffix",
+        action="store",
+        help="In batch mode, replace the extension of each input file with this to name its output (default depends on --output-format)",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--compress",
+        action="store",
+        help="Compress the output as it is written (in batch mode, .gz or .zst is added to the default suffix). zstd needs python 3.14+ or the zstandard package. Compressed input is detected and decompressed whatever this is",
+        choices=tuple(COMPRESSIONS),
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_const",
+        help="Short for --compress gzip",
+        dest="compress",
+        const="gzip",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the time spent in each stage of the conversion and counts of rings, holes and vertices to stderr",
+        required=False,
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    args = parser.parse_args()
+    if args.compress == "zstd":
+        try:
+            _zstd()
+        except ImportError as e:
+            parser.error(str(e))
+
+    paths = _expandPaths(args.files, INPUT_FORMATS[args.input_format])
+    batch = (
+        args.output_dir is not None
+        or len(paths) > 1
+        or any(os.path.isdir(path) or _isPattern(path) for path in args.files)
+    )
+
+    if batch:
+        if not paths:
+            parser.error("no input files found")
+        return _convertBatch(paths, args)
+
+    if not paths or paths == ["-"]:
+        if sys.stdin.isatty():
+            parser.print_help()
+            return 0
+        src = nullcontext(sys.stdin)
+    else:
+        try:
+            src = open(paths[0], "rb")
+        except OSError as e:
+            parser.error(f"can't open '{paths[0]}': {e}")
 
-    sys.stdout.write(arcgis2geojson(args.file.read(), idAttribute=args.id))
+    with collect_stats() if args.stats else nullcontext() as stats:
+        with src as fp, _decompressed(getattr(fp, "buffer", fp)) as stream:
+            sys.stdout.flush()
+            stdout = getattr(sys.stdout, "buffer", sys.stdout)
+            with _compressed(stdout, args.compress) as dst:
+                _convertInput(stream, dst, args)
+    if stats is not None:
+        sys.stderr.write(stats.report() + "\n")
     return 0
 
 
@@ -0,0 +1,347 @@
+"""
+Decoder for the ArcGIS FeatureCollection protocol buffer format returned by
+feature service queries with f=pbf (esriPBuffer.FeatureCollectionPBuffer).
+
+The buffer is decoded to the ArcGIS JSON the same query would return with
+f=json and quantizationParameters: geometries keep their quantized, delta
+encoded integer coordinates and the layer's "transform" describes how to
+decode them, which convert() does as it converts each feature.
+"""
+
+import struct
+
+GEOMETRY_TYPES = {
+    0: "esriGeometryPoint",
+    1: "esriGeometryMultipoint",
+    2: "esriGeometryPolyline",
+    3: "esriGeometryPolygon",
+    4: "esriGeometryMultiPatch",
+}
+
+FIELD_TYPES = (
+    "esriFieldTypeSmallInteger",
+    "esriFieldTypeInteger",
+    "esriFieldTypeSingle",
+    "esriFieldTypeDouble",
+    "esriFieldTypeString",
+    "esriFieldTypeDate",
+    "esriFieldTypeOID",
+    "esriFieldTypeGeometry",
+    "esriFieldTypeBlob",
+    "esriFieldTypeRaster",
+    "esriFieldTypeGUID",
+    "esriFieldTypeGlobalID",
+    "esriFieldTypeXML",
+)
+
+ORIGIN_POSITIONS = ("upperLeft", "lowerLeft")
+
+# wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+FIXED32 = 5
+
+_double = struct.Struct("<d")
+_float = struct.Struct("<f")
+
+
+def _readVarint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _signed(value):
+    # int32/int64 are encoded as 64 bit two's complement
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _zigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _fields(buf, start, end):
+    """
+    iterate over the fields of the message in buf[start:end], yielding
+    (field number, wire type, value). the value of a length delimited field
+    is its (start, end) in buf, so nested messages are never copied
+    """
+
+    pos = start
+    while pos < end:
+        key, pos = _readVarint(buf, pos)
+        number, wireType = key >> 3, key & 7
+        if wireType == VARINT:
+            value, pos = _readVarint(buf, pos)
+        elif wireType == FIXED64:
+            value = buf[pos:][:8]
+            pos += 8
+        elif wireType == LENGTH_DELIMITED:
+            length, pos = _readVarint(buf, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wireType == FIXED32:
+            value = buf[pos:][:4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protocol buffer wire type {wireType}")
+        if pos > end:
+            raise ValueError("Truncated protocol buffer message")
+        yield number, wireType, value
+
+
+def _string(buf, value):
+    start, end = value
+    return bytes(buf[start:end]).decode("utf-8")
+
+
+def _packedVarints(buf, wireType, value):
+    # repeated scalars may be packed or (from older writers) not
+    if wireType == VARINT:
+        return [value]
+    values = []
+    pos, end = value
+    while pos < end:
+        varint, pos = _readVarint(buf, pos)
+        values.append(varint)
+    return values
+
+
+def _decodeMessage(buf, value, decoders):
+    """
+    decode a message to a dict, using decoders: field number -> (key, decode)
+    unknown fields are skipped
+    """
+
+    start, end = value
+    message = {}
+    for number, wireType, fieldValue in _fields(buf, start, end):
+        if number in decoders:
+            key, decode = decoders[number]
+            message[key] = decode(buf, wireType, fieldValue)
+    return message
+
+
+def _varintField(buf, wireType, value):
+    return value
+
+
+def _doubleField(buf, wireType, value):
+    return _double.unpack(value)[0]
+
+
+def _stringField(buf, wireType, value):
+    return _string(buf, value)
+
+
+def _decodeValue(buf, value):
+    start, end = value
+    for number, wireType, fieldValue in _fields(buf, start, end):
+        if number == 1:
+            return _string(buf, fieldValue)
+        if number == 2:
+            return _float.unpack(fieldValue)[0]
+        if number == 3:
+            return _double.unpack(fieldValue)[0]
+        if number in (4, 8):
+            return _zigzag(fieldValue)
+        if number in (5, 7):
+            return fieldValue
+        if number == 6:
+            return _signed(fieldValue)
+        if number == 9:
+            return bool(fieldValue)
+    # a Value with nothing set is a null
+    return None
+
+
+def _decodeSpatialReference(buf, wireType, value):
+    return _decodeMessage(
+        buf,
+        value,
+        {
+            1: ("wkid", _varintField),
+            2: ("latestWkid", _varintField),
+            3: ("vcsWkid", _varintField),
+            4: ("latestVcsWkid", _varintField),
+            5: ("wkt", _stringField),
+        },
+    )
+
+
+def _decodeField(buf, wireType, value):
+    field = _decodeMessage(
+        buf,
+        value,
+        {
+            1: ("name", _stringField),
+            2: ("type", _varintField),
+            3: ("alias", _stringField),
+        },
+    )
+    fieldType = field.get("type", 0)
+    if fieldType < len(FIELD_TYPES):
+        field["type"] = FIELD_TYPES[fieldType]
+    else:
+        del field["type"]
+    return field
+
+
+def _decodeTransform(buf, wireType, value):
+    # proto3 writers leave out fields (and messages) holding their defaults
+    transform = {
+        "originPosition": ORIGIN_POSITIONS[0],
+        "scale": [1.0] * 4,
+        "translate": [0.0] * 4,
+    }
+    start, end = value
+    for number, fieldWireType, fieldValue in _fields(buf, start, end):
+        if number == 1:
+            transform["originPosition"] = ORIGIN_POSITIONS[fieldValue]
+        elif number in (2, 3):
+            message = _decodeMessage(
+                buf,
+                fieldValue,
+                {i: (i, _doubleField) for i in (1, 2, 3, 4)},
+            )
+            # an unset scale is 1, not proto3's default of 0. values are
+            # ordered x, y, z, m as in ArcGIS JSON
+            default = 1.0 if number == 2 else 0.0
+            values = [message.get(i, default) for i in (1, 2, 4, 3)]
+            transform["scale" if number == 2 else "translate"] = values
+    return transform
+
+
+def _decodeGeometry(buf, value, geometryType, hasZ, hasM):
+    lengths = []
+    coords = []
+    start, end = value
+    for number, wireType, fieldValue in _fields(buf, start, end):
+        if number == 2:
+            lengths.extend(_packedVarints(buf, wireType, fieldValue))
+        elif number == 3:
+            coords.extend(
+                _zigzag(coord) for coord in _packedVarints(buf, wireType, fieldValue)
+            )
+
+    dimensions = 2 + hasZ + hasM
+    positions = [list(position) for position in zip(*[iter(coords)] * dimensions)]
+    if geometryType == 0:
+        if not positions:
+            return None
+        geometry = {"x": positions[0][0], "y": positions[0][1]}
+        if hasZ:
+            geometry["z"] = positions[0][2]
+        if hasM:
+            geometry["m"] = positions[0][-1]
+        return geometry
+    if geometryType == 1:
+        return {"points": positions}
+    if geometryType in (2, 3):
+        parts = []
+        partEnd = 0
+        for length in lengths or [len(positions)]:
+            partStart, partEnd = partEnd, partEnd + length
+            parts.append(positions[partStart:partEnd])
+        return {"paths" if geometryType == 2 else "rings": parts}
+    # multipatches have no ArcGIS JSON equivalent we can convert
+    return None
+
+
+def _decodeFeatureResult(buf, value):
+    layer = {}
+    fields = []
+    featureValues = []
+    # esriGeometryTypePoint is 0, so proto3 writers leave it out
+    geometryType = 0
+    start, end = value
+    for number, wireType, fieldValue in _fields(buf, start, end):
+        if number == 1:
+            layer["objectIdFieldName"] = _string(buf, fieldValue)
+        elif number == 3:
+            layer["globalIdFieldName"] = _string(buf, fieldValue)
+        elif number == 7:
+            geometryType = fieldValue
+        elif number == 8:
+            layer["spatialReference"] = _decodeSpatialReference(
+                buf, wireType, fieldValue
+            )
+        elif number == 9:
+            layer["exceededTransferLimit"] = bool(fieldValue)
+        elif number == 10:
+            layer["hasZ"] = bool(fieldValue)
+        elif number == 11:
+            layer["hasM"] = bool(fieldValue)
+        elif number == 12:
+            layer["transform"] = _decodeTransform(buf, wireType, fieldValue)
+        elif number == 13:
+            fields.append(_decodeField(buf, wireType, fieldValue))
+        elif number == 15:
+            featureValues.append(fieldValue)
+
+    if geometryType in GEOMETRY_TYPES:
+        layer["geometryType"] = GEOMETRY_TYPES[geometryType]
+    layer["fields"] = fields
+
+    names = [field.get("name") for field in fields]
+    hasZ = layer.get("hasZ", False)
+    hasM = layer.get("hasM", False)
+    features = []
+    for featureValue in featureValues:
+        attributes = []
+        geometry = None
+        start, end = featureValue
+        for number, wireType, fieldValue in _fields(buf, start, end):
+            if number == 1:
+                attributes.append(_decodeValue(buf, fieldValue))
+            elif number == 2:
+                geometry = _decodeGeometry(buf, fieldValue, geometryType, hasZ, hasM)
+        feature = {"attributes": dict(zip(names, attributes))}
+        if geometry is not None:
+            feature["geometry"] = geometry
+        features.append(feature)
+    layer["features"] = features
+    return layer
+
+
+def decode(data):
+    """
+    Decode an ArcGIS FeatureCollection PBF buffer to ArcGIS JSON. A feature
+    query result is decoded to a layer with (quantized) features, a count
+    or object ids query result to {"count": n} or {"objectIds": [...]}
+    """
+
+    buf = memoryview(data).cast("B")
+    try:
+        for number, wireType, value in _fields(buf, 0, len(buf)):
+            if number != 2:
+                continue
+            start, end = value
+            for resultNumber, resultWireType, result in _fields(buf, start, end):
+                if resultNumber == 1:
+                    return _decodeFeatureResult(buf, result)
+                if resultNumber == 2:
+                    return _decodeMessage(buf, result, {1: ("count", _varintField)})
+                if resultNumber == 3:
+                    ids = _decodeMessage(
+                        buf, result, {1: ("objectIdFieldName", _stringField)}
+                    )
+                    ids["objectIds"] = [
+                        objectId
+                        for idNumber, idWireType, idValue in _fields(
+                            buf, result[0], result[1]
+                        )
+                        if idNumber == 3
+                        for objectId in _packedVarints(buf, idWireType, idValue)
+                    ]
+                    return ids
+    except (IndexError, struct.error) as e:
+        raise ValueError("Truncated protocol buffer message") from e
+    return {}
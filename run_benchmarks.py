@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+from arcgis2geojson import arcgis2geojson, convert
+
+"""
+Benchmarks for arcgis2geojson, run against synthetic ArcGIS JSON payloads.
+
+Usage: ./run_benchmarks.py [--scale N] [--repeat N] [name ...]
+"""
+
+
+def ring(cx, cy, radius, vertices, clockwise):
+    """
+    a closed, roughly circular ring. clockwise rings are outer rings in
+    ArcGIS JSON, counter-clockwise rings are holes
+    """
+    direction = -1 if clockwise else 1
+    coordinates = []
+    for i in range(vertices):
+        angle = direction * 2 * math.pi * i / vertices
+        r = radius * random.uniform(0.9, 1.0)
+        coordinates.append([cx + r * math.cos(angle), cy + r * math.sin(angle)])
+    coordinates.append(list(coordinates[0]))
+    return coordinates
+
+
+def feature(geometry, i):
+    return {"geometry": geometry, "attributes": {"OBJECTID": i, "name": f"f{i}"}}
+
+
+def collection(geometries, geometryType):
+    return {
+        "geometryType": geometryType,
+        "spatialReference": {"wkid": 4326},
+        "features": [feature(g, i) for i, g in enumerate(geometries)],
+    }
+
+
+def points(scale):
+    count = 20000 * scale
+    geometries = [
+        {"x": random.uniform(-180, 180), "y": random.uniform(-90, 90)}
+        for _ in range(count)
+    ]
+    return collection(geometries, "esriGeometryPoint"), count, count
+
+
+def polylines(scale):
+    count = 20 * scale
+    vertices = 5000
+    geometries = []
+    for _ in range(count):
+        x, y = random.uniform(-180, 180), random.uniform(-90, 90)
+        path = []
+        for _ in range(vertices):
+            x += random.uniform(-0.01, 0.01)
+            y += random.uniform(-0.01, 0.01)
+            path.append([x, y])
+        geometries.append({"paths": [path]})
+    return collection(geometries, "esriGeometryPolyline"), count, count * vertices
+
+
+def polygonWithHoles(scale):
+    count = 5 * scale
+    holes = 100
+    vertices = 64
+    geometries = []
+    for _ in range(count):
+        rings = [ring(0, 0, 100, vertices * 10, True)]
+        for i in range(holes):
+            angle = 2 * math.pi * i / holes
+            cx, cy = 60 * math.cos(angle), 60 * math.sin(angle)
+            rings.append(ring(cx, cy, 1.5, vertices, False))
+        geometries.append({"rings": rings})
+    total = count * (vertices * 10 + 1 + holes * (vertices + 1))
+    return collection(geometries, "esriGeometryPolygon"), count, total
+
+
+def multipolygonWithHolesOutsideOuters(scale):
+    """
+    outer rings in a grid, each with a hole that crosses its boundary, so
+    holes are matched by the intersects fallback
+    """
+    count = 5 * scale
+    grid = 10
+    vertices = 64
+    geometries = []
+    for _ in range(count):
+        rings = []
+        for gx in range(grid):
+            for gy in range(grid):
+                rings.append(ring(gx * 10, gy * 10, 4, vertices, True))
+                rings.append(ring(gx * 10 + 3, gy * 10, 2, vertices, False))
+        geometries.append({"rings": rings})
+    total = count * grid * grid * 2 * (vertices + 1)
+    return collection(geometries, "esriGeometryPolygon"), count, total
+
+
+def featureCollection(scale):
+    count = 5000 * scale
+    geometries = [
+        {
+            "rings": [
+                ring(random.uniform(-180, 180), random.uniform(-90, 90), 1, 8, True)
+            ]
+        }
+        for _ in range(count)
+    ]
+    return collection(geometries, "esriGeometryPolygon"), count, count * 9
+
+
+def featureCollectionString(scale):
+    arcgis, count, total = featureCollection(scale)
+    return json.dumps(arcgis), count, total
+
+
+BENCHMARKS = {
+    "points": (points, convert),
+    # paths are passed through unless they have to be copied
+    "polylines": (polylines, partial(convert, copy=True)),
+    "polygon-with-holes": (polygonWithHoles, convert),
+    "multipolygon-holes-outside-outers": (
+        multipolygonWithHolesOutsideOuters,
+        convert,
+    ),
+    "feature-collection": (featureCollection, convert),
+    "feature-collection-string": (featureCollectionString, arcgis2geojson),
+}
+
+
+def run(name, scale, repeat):
+    generate, fn = BENCHMARKS[name]
+    random.seed(name)
+    payload, features, vertices = generate(scale)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "seconds": best,
+        "features/s": features / best,
+        "vertices/s": vertices / best,
+        "peak MiB": peak / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark arcgis2geojson")
+    parser.add_argument(
+        "names",
+        nargs="*",
+        metavar="name",
+        help=f"Benchmarks to run (default: all). One of {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument(
+        "--scale", type=int, default=1, help="Multiply the size of each payload"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Report the best of this many runs"
+    )
+    args = parser.parse_args()
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}'")
+
+    print(
+        f"{'benchmark':<36}{'seconds':>10}{'features/s':>14}"
+        f"{'vertices/s':>14}{'peak MiB':>10}"
+    )
+    for name in args.names or BENCHMARKS:
+        result = run(name, args.scale, args.repeat)
+        print(
+            f"{result['name']:<36}{result['seconds']:>10.4f}"
+            f"{result['features/s']:>14,.0f}{result['vertices/s']:>14,.0f}"
+            f"{result['peak MiB']:>10.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
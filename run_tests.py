@@ -1,13 +1,48 @@
 #!/usr/bin/env python
 
+import asyncio
+import gzip
+import importlib.util
 import io
 import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
-from contextlib import redirect_stdout
+import urllib.request
+from contextlib import redirect_stderr, redirect_stdout
 from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
-
-from arcgis2geojson import arcgis2geojson, main
+from urllib.parse import parse_qs, urlparse
+
+from arcgis2geojson import (
+    OUTPUT_FORMATS,
+    CompactGeometry,
+    ConversionCache,
+    LazyFeature,
+    aiter_convert,
+    arcgis2geojson,
+    arrayIntersectsArray,
+    collect_stats,
+    convert,
+    convert_parallel,
+    convert_pbf,
+    dump,
+    dumps_geojson,
+    get_json_backend,
+    iter_convert,
+    load,
+    main,
+    pbf,
+    set_geometry_backend,
+    write_feature_collection,
+    write_geojsonseq,
+    write_ndjson,
+)
 
 """
 arcgis2geojson is a derivative work of ESRI's arcgis-to-geojson-utils:
@@ -19,6 +54,76 @@ Ported to Python in 2016 by Chris Shaw.
 arcgis2geojson is made available under the MIT License.
 """
 
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name, mode="r"):
+    with open(os.path.join(FIXTURES, name), mode) as f:
+        return f.read()
+
+
+def zstdModule():
+    for name in ("compression.zstd", "zstandard"):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    return None
+
+
+class StubFeatureServer(ThreadingHTTPServer):
+    """
+    serves a layer of point features a page at a time, like a FeatureServer
+    query with resultOffset and resultRecordCount
+    """
+
+    def __init__(self, count):
+        super().__init__(("127.0.0.1", 0), StubQueryHandler)
+        self.count = count
+        self.requests = []
+
+
+class StubQueryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query["resultOffset"][0])
+        size = int(query["resultRecordCount"][0])
+        self.server.requests.append(offset)
+        ids = range(offset, min(offset + size, self.server.count))
+        page = {
+            "geometryType": "esriGeometryPoint",
+            "features": [
+                {"geometry": {"x": i, "y": i}, "attributes": {"OBJECTID": i}}
+                for i in ids
+            ],
+        }
+        if offset + size < self.server.count:
+            page["exceededTransferLimit"] = True
+        body = json.dumps(page).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def fetchPages(url, size):
+    offset = 0
+    while True:
+        with await asyncio.to_thread(
+            urllib.request.urlopen,
+            f"{url}?resultOffset={offset}&resultRecordCount={size}",
+        ) as response:
+            yield await asyncio.to_thread(response.read)
+        offset += size
+
+
+async def collect(features):
+    return [feature async for feature in features]
+
 
 class ArcGisToGeoJsonTests(unittest.TestCase):
     def test_convert_arcgis_point_to_geojson_point(self):
@@ -37,6 +142,37 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
         self.assertEqual(output["coordinates"], [-66.796875, 20.0390625])
         self.assertEqual(output["type"], "Point")
 
+    def test_convert_bytes_json_to_bytes_json(self):
+        input = json.dumps(
+            {"x": -66.796875, "y": 20.0390625, "spatialReference": {"wkid": 4326}}
+        ).encode("utf-8")
+        output = arcgis2geojson(input)
+        self.assertIsInstance(output, bytes)
+        output = json.loads(output)
+        self.assertEqual(output["coordinates"], [-66.796875, 20.0390625])
+        self.assertEqual(output["type"], "Point")
+
+    @unittest.skipIf(importlib.util.find_spec("orjson") is None, "requires orjson")
+    def test_convert_with_orjson_backend(self):
+        input = json.dumps(
+            {"attributes": {"name": "caf\u00e9"}, "geometry": {"x": 1.5, "y": 2}}
+        )
+        output = arcgis2geojson(input, jsonBackend="orjson")
+        self.assertIsInstance(output, str)
+        self.assertEqual(json.loads(output), arcgis2geojson(json.loads(input)))
+
+        output = arcgis2geojson(input.encode("utf-8"), jsonBackend="orjson")
+        self.assertIsInstance(output, bytes)
+        self.assertEqual(json.loads(output), arcgis2geojson(json.loads(input)))
+
+    def test_json_backends(self):
+        self.assertEqual(get_json_backend().name, "json")
+        self.assertIn(
+            get_json_backend("auto").name, ("orjson", "ujson", "simdjson", "json")
+        )
+        with self.assertRaises(ValueError):
+            get_json_backend("yaml")
+
     def test_convert_arcgis_point_with_z_value_to_geojson_point(self):
         input = {
             "x": -66.796875,
@@ -437,6 +573,104 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
         )
         self.assertEqual(output["type"], "Polygon")
 
+    def test_parse_holes_in_many_outer_rings_to_geojson_multipolygon(self):
+        outers = [
+            [[x, 0], [x, 10], [x + 10, 10], [x + 10, 0], [x, 0]]
+            for x in range(0, 60, 20)
+        ]
+        holes = [
+            [[x + 2, 2], [x + 8, 2], [x + 8, 8], [x + 2, 8], [x + 2, 2]]
+            for x in range(40, -20, -20)
+        ]
+        input = {"rings": outers + holes, "spatialReference": {"wkid": 4326}}
+
+        output = arcgis2geojson(input)
+        self.assertEqual(output["type"], "MultiPolygon")
+        self.assertEqual(
+            output["coordinates"],
+            [[outer[::-1], hole[::-1]] for outer, hole in zip(outers, reversed(holes))],
+        )
+
+    def test_parse_holes_in_grid_of_outer_rings_to_geojson_multipolygon(self):
+        # many small outer rings, and one around all of them whose envelope
+        # covers too many cells of the index to be listed in each
+        outers = [
+            [[x, y], [x, y + 8], [x + 8, y + 8], [x + 8, y], [x, y]]
+            for x in range(0, 200, 10)
+            for y in range(0, 200, 10)
+        ]
+        holes = [
+            [
+                [x + 2, y + 2],
+                [x + 4, y + 2],
+                [x + 4, y + 4],
+                [x + 2, y + 4],
+                [x + 2, y + 2],
+            ]
+            for (x, y), *_ in outers
+        ]
+        border = [[-10, -10], [-10, 210], [210, 210], [210, -10], [-10, -10]]
+        # crosses the border, so is only matched by the intersects fallback
+        crossing = [[-20, -5], [-5, -5], [-5, -2], [-20, -2], [-20, -5]]
+        input = {"rings": [border] + outers + holes + [crossing]}
+
+        output = convert(input)
+        self.assertEqual(output["type"], "MultiPolygon")
+        self.assertEqual(
+            output["coordinates"],
+            [[border[::-1], crossing[::-1]]]
+            + [[outer[::-1], hole[::-1]] for outer, hole in zip(outers, holes)],
+        )
+
+    def test_array_intersects_array(self):
+        square = [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]
+        crossing = [[5, 5], [15, 5], [15, 15], [5, 15], [5, 5]]
+        touching = [[10, 10], [20, 10], [20, 20], [10, 20], [10, 10]]
+        inside = [[2, 2], [8, 2], [8, 8], [2, 8], [2, 2]]
+        # bounding boxes overlap but no segments touch
+        corner = [[9.5, 11], [11, 9.5], [12, 12], [9.5, 11]]
+
+        self.assertTrue(arrayIntersectsArray(square, crossing))
+        self.assertTrue(arrayIntersectsArray(crossing, square))
+        self.assertTrue(arrayIntersectsArray(square, touching))
+        self.assertFalse(arrayIntersectsArray(square, inside))
+        self.assertFalse(arrayIntersectsArray(inside, square))
+        self.assertFalse(arrayIntersectsArray(square, corner))
+
+    def test_invalid_geometry_backend(self):
+        with self.assertRaises(ValueError):
+            set_geometry_backend("fortran")
+
+    def test_import_leaves_slow_modules_unimported(self):
+        modules = ("numpy", "asyncio", "concurrent.futures.process")
+        code = f"import sys, arcgis2geojson; print([m for m in {modules!r} if m in sys.modules])"
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "requires numpy")
+    def test_numpy_geometry_backend_matches_python(self):
+        self.addCleanup(set_geometry_backend, "auto")
+        input = {
+            "rings": [
+                [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]],
+                [[2, 2, 1], [8, 2, 1], [8, 8, 1], [2, 8, 1], [2, 2, 1]],
+                [[20, 0], [20, 10], [30, 10], [30, 0]],
+                [[18, 2], [28, 2], [28, 8], [18, 8], [18, 2]],
+                [[40, 2], [48, 2], [48, 8], [40, 8], [40, 2]],
+            ]
+        }
+
+        set_geometry_backend("python")
+        expected = convert(deepcopy(input))
+        set_geometry_backend("numpy")
+        output = convert(deepcopy(input))
+
+        self.assertEqual(output, expected)
+        self.assertEqual(output["type"], "MultiPolygon")
+        self.assertEqual(len(output["coordinates"]), 3)
+
     def test_parse_arcgis_feature_to_geojson_feature(self):
         input = {
             "geometry": {
@@ -673,6 +907,13 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
         self.assertEqual(output["geometry"], None)
         self.assertEqual(output["properties"]["foo"], "bar")
 
+    def test_parse_arcgis_feature_with_null_geometry(self):
+        input = {"geometry": None, "attributes": {"OBJECTID": 1}}
+
+        output = arcgis2geojson(input)
+        self.assertEqual(output["geometry"], None)
+        self.assertEqual(output["id"], 1)
+
     def test_custom_id_field(self):
         input = {
             "x": -66.796875,
@@ -759,6 +1000,59 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
 
         self.assertEqual(input, expected)
 
+    def test_do_not_modify_original_open_rings(self):
+        input = {
+            "rings": [
+                [[41.8359375, 71.015625], [56.953125, 33.75], [21.796875, 36.5625]]
+            ]
+        }
+
+        expected = deepcopy(input)
+        output = arcgis2geojson(input)
+
+        self.assertEqual(input, expected)
+        self.assertEqual(len(output["coordinates"][0]), 4)
+
+    def test_copy_shares_nothing_with_input(self):
+        input = {
+            "features": [
+                {
+                    "geometry": {"rings": [[[0, 0], [0, 1], [1, 1], [1, 0]]]},
+                    "attributes": {"OBJECTID": 1, "TAGS": ["a", {"b": 1}]},
+                },
+                {"geometry": {"paths": [[[0, 0], [1, 1]]]}, "attributes": {}},
+                {"geometry": {"points": [[0, 0], [1, 1]]}, "attributes": {}},
+            ]
+        }
+
+        expected = deepcopy(input)
+        output = convert(input, copy=True)
+        self.assertEqual(output, convert(deepcopy(input)))
+
+        output["features"][0]["geometry"]["coordinates"][0][0][0] = 99
+        output["features"][0]["properties"]["OBJECTID"] = 99
+        output["features"][0]["properties"]["TAGS"][1]["b"] = 99
+        output["features"][1]["geometry"]["coordinates"][0][0] = 99
+        output["features"][2]["geometry"]["coordinates"][0][0] = 99
+        self.assertEqual(input, expected)
+
+        output = convert(input, copy=True, fields=["TAGS"])
+        output["features"][0]["properties"]["TAGS"].append("c")
+        self.assertEqual(input, expected)
+
+    def test_no_copy_rewinds_rings_in_place(self):
+        outer = [[0, 0], [0, 10], [10, 10], [10, 0]]
+        hole = [[2, 2], [8, 2], [8, 8], [2, 8], [2, 2]]
+        input = {"rings": [outer, hole]}
+
+        expected = convert(deepcopy(input))
+        output = convert(input, copy=False)
+
+        self.assertEqual(output, expected)
+        self.assertIs(output["coordinates"][0], outer)
+        self.assertIs(output["coordinates"][1], hole)
+        self.assertEqual(outer, expected["coordinates"][0])
+
     def test_convert_arcgis_extent_to_geojson_polygon(self):
         input = {
             "xmax": -35.5078125,
@@ -781,6 +1075,997 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
             ],
         )
 
+    def test_convert_layer_with_geometry_type(self):
+        input = {
+            "geometryType": "esriGeometryPolyline",
+            "spatialReference": {"wkid": 4326},
+            "features": [
+                {
+                    "geometry": {"paths": [[[0, 0], [1, 1]]]},
+                    "attributes": {"OBJECTID": 1},
+                },
+                {"geometry": None, "attributes": {"OBJECTID": 2}},
+                {"geometry": {}, "attributes": {"OBJECTID": 3}},
+                # doesn't match the layer's geometryType
+                {"geometry": {"x": 1, "y": 2}, "attributes": {"OBJECTID": 4}},
+            ],
+        }
+
+        output = arcgis2geojson(input)
+        self.assertEqual(
+            [feature["geometry"] for feature in output["features"]],
+            [
+                {"type": "LineString", "coordinates": [[0, 0], [1, 1]]},
+                None,
+                None,
+                {"type": "Point", "coordinates": [1, 2]},
+            ],
+        )
+        self.assertEqual(
+            [feature["id"] for feature in output["features"]], [1, 2, 3, 4]
+        )
+
+    def test_convert_layer_with_geometry_type_not_a_feature(self):
+        for geometryType in ("esriGeometryPolygon", None):
+            input = {"features": [{}, {"x": 1, "y": 2}]}
+            if geometryType:
+                input["geometryType"] = geometryType
+            expected = [{}, {"type": "Point", "coordinates": [1, 2]}]
+            self.assertEqual(convert(input)["features"], expected)
+            self.assertEqual(
+                list(iter_convert(io.StringIO(json.dumps(input)))), expected
+            )
+
+    def test_convert_quantized_json(self):
+        expected = convert(json.loads(fixture("parcels.json")))
+        self.assertEqual(len(expected["features"]), 3)
+
+        quantized = fixture("parcels-quantized.json")
+        self.assertEqual(convert(json.loads(quantized)), expected)
+        self.assertEqual(
+            list(iter_convert(io.StringIO(quantized))), expected["features"]
+        )
+        self.assertEqual(
+            convert_parallel(json.loads(quantized), workers=2, chunksize=2),
+            expected,
+        )
+
+    def test_convert_quantized_upper_left_with_z(self):
+        input = {
+            "geometryType": "esriGeometryPolyline",
+            "hasZ": True,
+            "transform": {
+                "originPosition": "upperLeft",
+                "scale": [2, 4, 0.5],
+                "translate": [100, 1000, 10],
+            },
+            "features": [
+                {
+                    "geometry": {"paths": [[[1, 1, 4], [2, 3, 6], [-1, -1, 8]]]},
+                    "attributes": {"OBJECTID": 1},
+                },
+                {
+                    "geometry": {"x": 5, "y": 10, "z": 2},
+                    "attributes": {"OBJECTID": 2},
+                },
+            ],
+        }
+        original = deepcopy(input)
+
+        output = convert(input)
+        self.assertEqual(
+            output["features"][0]["geometry"],
+            {
+                "type": "LineString",
+                "coordinates": [[102, 996, 12], [106, 984, 13], [104, 988, 14]],
+            },
+        )
+        self.assertEqual(
+            output["features"][1]["geometry"],
+            {"type": "Point", "coordinates": [110, 960, 11]},
+        )
+        self.assertEqual(input, original)
+
+    def test_convert_pbf(self):
+        data = fixture("parcels.pbf", "rb")
+        expected = convert(json.loads(fixture("parcels.json")))
+
+        self.assertEqual(convert_pbf(data), expected)
+
+        decoded = pbf.decode(data)
+        self.assertEqual(decoded["geometryType"], "esriGeometryPolygon")
+        self.assertEqual(
+            decoded["spatialReference"], {"wkid": 4326, "latestWkid": 4326}
+        )
+        self.assertEqual(
+            decoded["fields"], json.loads(fixture("parcels.json"))["fields"]
+        )
+        self.assertEqual(decoded["transform"]["originPosition"], "upperLeft")
+        self.assertNotIn("geometry", decoded["features"][2])
+
+    def test_load(self):
+        expected = convert(json.loads(fixture("parcels.json")))
+        self.assertEqual(load(os.path.join(FIXTURES, "parcels.json")), expected)
+        self.assertEqual(
+            load(os.path.join(FIXTURES, "parcels.pbf"), inputFormat="pbf"), expected
+        )
+        self.assertEqual(
+            load(os.path.join(FIXTURES, "parcels-quantized.json"), precision=6),
+            convert(json.loads(fixture("parcels-quantized.json")), precision=6),
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # files that can't be mapped are read
+            path = os.path.join(tmp, "empty.json")
+            open(path, "w").close()
+            with self.assertRaises(json.JSONDecodeError):
+                load(path)
+
+            path = os.path.join(tmp, "bom.json")
+            with open(path, "w", encoding="utf-8-sig") as f:
+                json.dump({"x": 1, "y": 2}, f)
+            self.assertEqual(load(path), {"type": "Point", "coordinates": [1, 2]})
+
+        with self.assertRaises(ValueError):
+            load(os.path.join(FIXTURES, "parcels.json"), inputFormat="xml")
+
+    def test_load_compressed(self):
+        expected = load(os.path.join(FIXTURES, "parcels.json"))
+        with tempfile.TemporaryDirectory() as tmp:
+            # detected by content, not name
+            for name in ("parcels.json.gz", "parcels.json"):
+                path = os.path.join(tmp, name)
+                with gzip.open(path, "wb") as f:
+                    f.write(fixture("parcels.json", "rb"))
+                self.assertEqual(load(path), expected)
+
+            path = os.path.join(tmp, "parcels.pbf.gz")
+            with gzip.open(path, "wb") as f:
+                f.write(fixture("parcels.pbf", "rb"))
+            self.assertEqual(load(path, inputFormat="pbf"), expected)
+
+    def test_convert_pbf_truncated(self):
+        data = fixture("parcels.pbf", "rb")
+        with self.assertRaises(ValueError):
+            convert_pbf(data[:-10])
+
+    def test_convert_pbf_points(self):
+        # as a proto3 writer encodes a point layer: geometryType, the
+        # transform's originPosition and its translate hold their defaults,
+        # so they are left out
+        data = fixture("points.pbf", "rb")
+        decoded = pbf.decode(data)
+        self.assertEqual(decoded["geometryType"], "esriGeometryPoint")
+        self.assertEqual(
+            decoded["transform"],
+            {
+                "originPosition": "upperLeft",
+                "scale": [0.5, 0.5, 1.0, 1.0],
+                "translate": [0.0, 0.0, 0.0, 0.0],
+            },
+        )
+        self.assertEqual(
+            convert_pbf(data),
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "geometry": {"type": "Point", "coordinates": [5.0, 7.0]},
+                        "properties": {"OBJECTID": 1, "NAME": "first"},
+                        "id": 1,
+                    },
+                    {
+                        "type": "Feature",
+                        "geometry": {"type": "Point", "coordinates": [2.0, 3.0]},
+                        "properties": {"OBJECTID": 2, "NAME": "second"},
+                        "id": 2,
+                    },
+                ],
+            },
+        )
+
+    def test_precision(self):
+        input = {
+            "features": [
+                {"geometry": {"x": -66.796875, "y": 20.0390625, "z": 1.23456}},
+                {"geometry": {"points": [[41.244772343082076, 2.0000001, None]]}},
+                {"geometry": {"paths": [[[1.11111, 2.22222], [3.33333, 4.44444]]]}},
+                {
+                    "geometry": {
+                        "rings": [
+                            [[0, 0], [0.123456, 1], [1, 1], [1, 0], [0, 0]],
+                        ]
+                    }
+                },
+                {"geometry": {"xmin": 1.005, "ymin": 2.5, "xmax": 3.14159, "ymax": 4}},
+            ]
+        }
+        original = deepcopy(input)
+
+        output = arcgis2geojson(input, precision=2)
+        self.assertEqual(
+            [feature["geometry"]["coordinates"] for feature in output["features"]],
+            [
+                [-66.8, 20.04, 1.23],
+                [[41.24, 2.0, None]],
+                [[1.11, 2.22], [3.33, 4.44]],
+                [[[0, 0], [1, 0], [1, 1], [0.12, 1], [0, 0]]],
+                [[[3.14, 4], [1.0, 4], [1.0, 2.5], [3.14, 2.5], [3.14, 4]]],
+            ],
+        )
+        self.assertEqual(input, original)
+
+        # and as text
+        self.assertEqual(
+            arcgis2geojson('{"x": 41.244772343082076, "y": 2}', precision=3),
+            '{"type": "Point", "coordinates": [41.245, 2]}',
+        )
+
+    def test_precision_dedupe(self):
+        path = [[0, 0], [0.001, 0.001], [0.002, 0], [1, 1], [1.001, 1]]
+        ring = [[0, 0], [0, 1], [0.001, 1], [1, 1], [1, 0], [0.001, 0], [0, 0]]
+        tiny = [[0, 0], [0, 0.001], [0.001, 0.001], [0.001, 0], [0, 0]]
+
+        output = convert({"paths": [path]}, precision=1)
+        self.assertEqual(len(output["coordinates"]), 5)
+
+        output = convert(
+            {"paths": [path, [[5, 5], [5.01, 5.01]]]}, precision=1, dedupe=True
+        )
+        self.assertEqual(
+            output["coordinates"],
+            [
+                [[0, 0], [1, 1]],
+                # too short once de-duplicated
+                [[5, 5], [5.0, 5.0]],
+            ],
+        )
+
+        output = convert({"rings": [ring]}, precision=1, dedupe=True)
+        self.assertEqual(
+            output["coordinates"], [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]
+        )
+
+        # a ring that collapses is kept rather than made invalid
+        output = convert({"rings": [tiny]}, precision=1, dedupe=True)
+        self.assertEqual(len(output["coordinates"][0]), 5)
+
+    def test_precision_reprojected(self):
+        input = {
+            "paths": [[[0, 0], [0.1, 0.1], [1113194.9079327357, 1113194.9079327357]]],
+            "spatialReference": {"wkid": 3857},
+        }
+
+        output = convert(input, reproject=True, precision=3, dedupe=True)
+        self.assertEqual(output["coordinates"], [[0.0, 0.0], [10.0, 9.95]])
+
+    def test_simplify_polyline(self):
+        input = {
+            "paths": [
+                [[0, 0], [1, 0.05], [2, -0.05], [3, 0], [4, 2], [5, 0]],
+                [[0, 0], [0, 0.01]],
+            ]
+        }
+        original = deepcopy(input)
+
+        output = convert(input, simplify=0.1)
+        self.assertEqual(
+            output["coordinates"],
+            [[[0, 0], [3, 0], [4, 2], [5, 0]], [[0, 0], [0, 0.01]]],
+        )
+        self.assertEqual(input, original)
+
+        output = convert(input, simplify=10)
+        self.assertEqual(output["coordinates"][0], [[0, 0], [5, 0]])
+
+    def test_simplify_polygon(self):
+        outer = [[0, 0], [0, 10], [5, 10.01], [10, 10], [10, 0], [5, -0.01], [0, 0]]
+        hole = [[2, 2], [5, 2.01], [8, 2], [8, 8], [2, 8], [2, 2]]
+        island = [[20, 20], [20, 20.01], [20.01, 20.01], [20.01, 20], [20, 20]]
+        input = {"rings": [outer, hole, island]}
+        original = deepcopy(input)
+
+        output = convert(input, simplify=0.1)
+        self.assertEqual(
+            output,
+            {
+                "type": "MultiPolygon",
+                "coordinates": [
+                    [
+                        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+                        [[2, 2], [2, 8], [8, 8], [8, 2], [2, 2]],
+                    ],
+                    # too small to simplify
+                    [[[20, 20], [20.01, 20], [20.01, 20.01], [20, 20.01], [20, 20]]],
+                ],
+            },
+        )
+        self.assertEqual(input, original)
+
+    def test_simplify_polygon_keeps_holes_inside(self):
+        # simplifying the outer ring would cut its bump off, and the hole in
+        # it with it, so the outer ring is kept as it was
+        outer = [[0, 0], [0, 10], [5, 10.4], [10, 10], [10, 0], [0, 0]]
+        hole = [[4, 10.1], [6, 10.1], [6, 10.25], [4, 10.25], [4, 10.1]]
+        output = convert({"rings": [outer, hole]}, simplify=0.5)
+        self.assertEqual(
+            output,
+            {"type": "Polygon", "coordinates": [outer[::-1], hole[::-1]]},
+        )
+
+        # the simplified hole would cross the outer ring's notch, so the
+        # hole is kept as it was
+        outer = [[0, 0], [0, 10], [4.9, 10], [5, 8.8], [5.1, 10], [10, 10], [10, 0]]
+        hole = [[2, 2], [8, 2], [8, 8.95], [5, 8.6], [2, 8.95], [2, 2]]
+        output = convert({"rings": [outer + [[0, 0]], hole]}, simplify=0.5)
+        self.assertEqual(
+            output,
+            {"type": "Polygon", "coordinates": [[[0, 0]] + outer[::-1], hole[::-1]]},
+        )
+
+        # holes that still fit are simplified
+        hole = [[2, 2], [8, 2], [8, 8], [5, 7.9], [2, 8], [2, 2]]
+        output = convert({"rings": [outer + [[0, 0]], hole]}, simplify=0.5)
+        self.assertEqual(
+            output["coordinates"][1], [[2, 2], [2, 8], [8, 8], [8, 2], [2, 2]]
+        )
+
+    def test_cache(self):
+        ring = [[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]
+        input = {
+            "geometryType": "esriGeometryPolygon",
+            "features": [
+                {"geometry": {"rings": [ring]}, "attributes": {"OBJECTID": i}}
+                for i in range(3)
+            ],
+        }
+        cache = ConversionCache()
+
+        output = convert(input, cache=cache)
+        self.assertEqual(output, convert(input))
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 1, 1))
+
+        # nothing returned from the cache shares anything with it
+        output["features"][1]["geometry"]["coordinates"][0][0][0] = 99
+        output["features"][2]["geometry"]["coordinates"][0].pop()
+        self.assertEqual(
+            convert({"rings": [ring]}, cache=cache),
+            {
+                "type": "Polygon",
+                "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]],
+            },
+        )
+        self.assertEqual(ring, [[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]])
+        self.assertEqual(cache.cache_info().hits, 3)
+
+        # options are part of the key
+        convert({"rings": [ring]}, cache=cache, precision=1)
+        self.assertEqual(cache.cache_info().misses, 2)
+
+        cache.cache_clear()
+        self.assertEqual(cache.cache_info()[:5], (0, 0, 0, 1024, 0))
+
+        # points aren't worth caching, and null coordinates can't be hashed
+        convert({"x": 1, "y": 2}, cache=cache)
+        convert({"points": [[1, None]]}, cache=cache)
+        self.assertEqual(cache.cache_info()[:5], (0, 0, 0, 1024, 0))
+
+    def test_cache_eviction(self):
+        cache = ConversionCache(maxsize=2)
+        for i in (1, 2, 1, 3, 2):
+            convert({"points": [[i, i]]}, cache=cache)
+        info = cache.cache_info()
+        # 2 was least recently used when 3 was added
+        self.assertEqual((info.hits, info.misses, info.evictions), (1, 4, 2))
+        self.assertEqual(len(cache), 2)
+
+        cache = ConversionCache(maxbytes=200)
+        paths = [[[i, i] for i in range(10)]]
+        convert({"paths": paths}, cache=cache)
+        convert({"paths": paths * 5}, cache=cache)
+        info = cache.cache_info()
+        self.assertLessEqual(info.nbytes, 200)
+        self.assertEqual((info.currsize, info.evictions), (1, 0))
+
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(cache.cache_info()[:5], (0, 0, 0, 1024, 0))
+        self.assertEqual(cache.maxbytes, 200)
+
+        # bounded only by bytes
+        cache = ConversionCache(maxsize=None, maxbytes=80)
+        for i in range(10):
+            convert({"points": [[i, i]]}, cache=cache)
+        info = cache.cache_info()
+        self.assertEqual((info.maxsize, info.currsize, info.nbytes), (None, 5, 80))
+        self.assertEqual(info.evictions, 5)
+
+        cache = ConversionCache(maxsize=None)
+        for i in range(2000):
+            convert({"points": [[i, i]]}, cache=cache)
+        self.assertEqual((len(cache), cache.cache_info().evictions), (2000, 0))
+
+    def test_compact(self):
+        input = {
+            "geometryType": "esriGeometryPolygon",
+            "features": [
+                {
+                    "geometry": {
+                        "rings": [
+                            [[0.5, 0], [0, 10], [10, 10], [10, 0], [0.5, 0]],
+                            [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]],
+                            [[20, 20], [20, 22], [22, 22], [22, 20], [20, 20]],
+                        ]
+                    },
+                    "attributes": {"OBJECTID": 1},
+                }
+            ],
+        }
+        output = convert(input, compact=True)
+        geometry = output["features"][0]["geometry"]
+        self.assertIsInstance(geometry, CompactGeometry)
+        self.assertEqual(geometry.type, "MultiPolygon")
+        self.assertEqual(geometry.dimensions, 2)
+        self.assertEqual(list(geometry.parts), [0, 5, 10, 15])
+        self.assertEqual(list(geometry.polygons), [0, 2, 3])
+        self.assertEqual(geometry.nbytes, 15 * 2 * 8 + 4 * 8 + 3 * 8)
+
+        expected = convert(input)
+        self.assertEqual(output, expected)
+        self.assertEqual(
+            geometry.coordinates,
+            expected["features"][0]["geometry"]["coordinates"],
+        )
+        self.assertEqual(json.loads(dumps_geojson(output)), expected)
+        self.assertEqual(
+            json.loads(arcgis2geojson(json.dumps(input), compact=True)), expected
+        )
+        self.assertEqual(pickle.loads(pickle.dumps(geometry)), geometry)
+
+        # the array is written as json would write the floats in it
+        line = convert({"paths": [[[1.5, 2], [float("nan"), 1e-20]]]}, compact=True)
+        self.assertEqual(
+            dumps_geojson(line),
+            '{"type": "LineString", "coordinates": [[1.5, 2.0], [NaN, 1e-20]]}',
+        )
+        # long parts are written a block of positions at a time
+        path = [[i / 7, -i, i * 1e6] for i in range(2500)]
+        line = convert({"paths": [path, path[:3]]}, compact=True)
+        self.assertEqual(
+            json.loads(dumps_geojson(line)),
+            {"type": "MultiLineString", "coordinates": [path, path[:3]]},
+        )
+        with io.StringIO() as buf:
+            write_ndjson(
+                iter_convert(io.StringIO(json.dumps(input)), compact=True), buf
+            )
+            self.assertEqual(json.loads(buf.getvalue()), expected["features"][0])
+
+        point = convert({"x": 1, "y": 2, "z": 3}, compact=True)
+        self.assertEqual((point.type, point.dimensions), ("Point", 3))
+        self.assertEqual(point.coordinates, [1, 2, 3])
+
+        # positions that can't be packed are left as they are
+        for points in ([[1, None]], [[1, 2], [1, 2, 3]]):
+            self.assertEqual(
+                convert({"points": points}, compact=True),
+                {"type": "MultiPoint", "coordinates": points},
+            )
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "requires numpy")
+    def test_compact_geo_interface(self):
+        geometry = convert(
+            {"paths": [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]}, compact=True
+        ).__geo_interface__
+        self.assertEqual(geometry["type"], "MultiLineString")
+        lines = geometry["coordinates"]
+        self.assertEqual(
+            [line.tolist() for line in lines], [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]
+        )
+        # views of the array, not copies
+        self.assertFalse(lines[1].flags.owndata)
+
+    def test_lazy(self):
+        input = json.loads(fixture("parcels.json"))
+        expected = convert(input)
+
+        with collect_stats() as stats:
+            output = convert(input, lazy=True)
+            features = output["features"]
+            self.assertTrue(all(isinstance(f, LazyFeature) for f in features))
+            self.assertEqual([f.id for f in features], [1, 2, 3])
+            self.assertEqual(features[1].properties, input["features"][1]["attributes"])
+            # the last feature has no geometry to convert
+            self.assertEqual([f.converted for f in features], [False, False, True])
+            self.assertNotIn("rings", stats.counters)
+
+            # only the geometry that is used is converted
+            self.assertEqual(features[0].geometry, expected["features"][0]["geometry"])
+            self.assertEqual([f.converted for f in features], [True, False, True])
+            self.assertEqual(stats.counters["rings"], 2)
+
+        self.assertEqual(output, expected)
+        self.assertEqual(features[2]["geometry"], expected["features"][2]["geometry"])
+        self.assertEqual(json.loads(dumps_geojson(convert(input, lazy=True))), expected)
+        with io.StringIO() as buf:
+            write_ndjson(
+                iter_convert(io.StringIO(fixture("parcels.json")), lazy=True), buf
+            )
+            self.assertEqual(
+                [json.loads(line) for line in buf.getvalue().splitlines()],
+                expected["features"],
+            )
+
+        feature = convert({"attributes": {"name": "no geometry"}}, lazy=True)
+        self.assertTrue(feature.converted)
+        self.assertEqual(
+            dict(feature),
+            {
+                "type": "Feature",
+                "geometry": None,
+                "properties": {"name": "no geometry"},
+            },
+        )
+        self.assertIsNone(feature.id)
+        self.assertNotIn("id", feature)
+
+    def test_filter(self):
+        input = json.loads(fixture("parcels.json"))
+        expected = convert(input, idAttribute="OBJECTID")["features"]
+
+        output = convert(input, "OBJECTID", fields=["NAME", ("AREA", "area")])
+        self.assertEqual(
+            [f["properties"] for f in output["features"]],
+            [
+                {"NAME": "Parcel with a courtyard", "area": 96.0},
+                {"NAME": "Split parcel", "area": 8.0},
+                {"NAME": "Parcel without geometry", "area": -1.5},
+            ],
+        )
+        # ids are still read from attributes that aren't kept
+        self.assertEqual([f["id"] for f in output["features"]], [1, 2, 3])
+        self.assertEqual(
+            convert(input, fields={"NOTES": "notes", "MISSING": "missing"}),
+            convert(input, fields=[("NOTES", "notes")]),
+        )
+
+        output = convert(input, "OBJECTID", geometry=False)
+        self.assertEqual(
+            output["features"],
+            [{**feature, "geometry": None} for feature in expected],
+        )
+
+        with collect_stats() as stats:
+            output = convert(input, "OBJECTID", where=lambda a: a["AREA"] > 10)
+        self.assertEqual(output["features"], expected[:1])
+        self.assertEqual(stats.counters["features skipped"], 2)
+        # features are filtered before their geometries are converted
+        self.assertEqual(stats.counters["rings"], 2)
+
+        # features without a geometry are outside every bbox
+        bbox = (9, 49, 11, 51)
+        self.assertEqual(
+            convert(input, "OBJECTID", bbox=bbox)["features"], expected[1:2]
+        )
+        self.assertEqual(
+            convert(input, "OBJECTID", bbox=(100, 100, 110, 110)),
+            {"type": "FeatureCollection", "features": []},
+        )
+        self.assertEqual(
+            load(
+                os.path.join(FIXTURES, "parcels-quantized.json"), "OBJECTID", bbox=bbox
+            ),
+            convert(input, "OBJECTID", bbox=bbox),
+        )
+        self.assertEqual(
+            convert_pbf(fixture("parcels.pbf", "rb"), "OBJECTID", bbox=bbox),
+            convert(input, "OBJECTID", bbox=bbox),
+        )
+        self.assertEqual(
+            list(iter_convert(io.StringIO(fixture("parcels.json")), bbox=bbox)),
+            convert(input, bbox=bbox)["features"],
+        )
+        with self.assertRaises(ValueError):
+            convert(input, bbox=(0, 0, 1))
+
+    def test_collect_stats(self):
+        input = {
+            "geometryType": "esriGeometryPolygon",
+            "features": [
+                {
+                    "geometry": {
+                        "rings": [
+                            [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]],
+                            # contained
+                            [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]],
+                            # crosses the outer ring
+                            [[8, 8], [12, 8], [12, 12], [8, 12], [8, 8]],
+                            # outside every outer ring
+                            [[20, 20], [22, 20], [22, 22], [20, 22], [20, 20]],
+                        ]
+                    },
+                    "attributes": {"OBJECTID": 1},
+                }
+            ],
+        }
+        reported = []
+        with collect_stats(callback=reported.append) as stats:
+            arcgis2geojson(json.dumps(input))
+
+        self.assertEqual(reported, [stats])
+        self.assertEqual(
+            set(stats.timings),
+            {"parse", "orient rings", "match holes", "convert", "serialise"},
+        )
+        self.assertEqual(
+            stats.counters,
+            {
+                "features": 1,
+                "rings": 4,
+                "vertices": 20,
+                "outer rings": 1,
+                "holes": 3,
+                "holes contained": 1,
+                "holes intersected": 1,
+                "holes promoted": 1,
+            },
+        )
+        self.assertIn("holes promoted", stats.report())
+
+        # nothing is recorded outside the context
+        convert(input)
+        self.assertEqual(stats.counters["features"], 1)
+
+    def test_collect_stats_counts_vertices_of_every_geometry(self):
+        rings = [[[0, 0], [0, 1], [1, 1], [1, 0]]]
+        with collect_stats() as stats:
+            # the open ring is closed in place, but counted as it was given
+            convert({"rings": rings}, copy=False)
+            convert({"paths": [[[0, 0], [1, 1]], [[2, 2], [3, 3], [4, 4]]]})
+            convert({"points": [[0, 0], [1, 1]]})
+            convert({"x": 1, "y": 2})
+            convert({"x": None, "y": None})
+            convert({"xmin": 0, "ymin": 0, "xmax": 1, "ymax": 1})
+        self.assertEqual(len(rings[0]), 5)
+        self.assertEqual(stats.counters["vertices"], 4 + 5 + 2 + 1 + 4)
+
+    def test_reproject_web_mercator(self):
+        input = {
+            "x": 20037508.342789244,
+            "y": 7558415.656081782,
+            "z": 10,
+            "spatialReference": {"wkid": 102100, "latestWkid": 3857},
+        }
+
+        with patch("arcgis2geojson.logger") as mock_logger:
+            output = arcgis2geojson(input, reproject=True)
+        mock_logger.warning.assert_not_called()
+        self.assertEqual(output["type"], "Point")
+        self.assertAlmostEqual(output["coordinates"][0], 180)
+        self.assertAlmostEqual(output["coordinates"][1], 56)
+        self.assertEqual(output["coordinates"][2], 10)
+        # the input is not modified
+        self.assertEqual(input["x"], 20037508.342789244)
+
+    def test_reproject_layer_spatial_reference(self):
+        input = {
+            "geometryType": "esriGeometryPolygon",
+            "spatialReference": {"wkid": 3857},
+            "features": [
+                {
+                    "geometry": {
+                        "rings": [
+                            [
+                                [0, 0],
+                                [0, 1113194.9079327357],
+                                [1113194.9079327357, 1113194.9079327357],
+                                [1113194.9079327357, 0],
+                                [0, 0],
+                            ]
+                        ]
+                    },
+                    "attributes": {"OBJECTID": 1},
+                },
+                {
+                    "geometry": {"x": 1, "y": 2, "spatialReference": {"wkid": 4326}},
+                    "attributes": {"OBJECTID": 2},
+                },
+            ],
+        }
+
+        for output in (
+            convert(input, reproject=True)["features"],
+            list(iter_convert(io.StringIO(json.dumps(input)), reproject=True)),
+        ):
+            ring = output[0]["geometry"]["coordinates"][0]
+            self.assertEqual(len(ring), 5)
+            self.assertAlmostEqual(ring[2][0], 10)
+            self.assertAlmostEqual(ring[2][1], 9.9496, places=4)
+            # a geometry's own spatialReference takes precedence over the layer's
+            self.assertEqual(output[1]["geometry"]["coordinates"], [1, 2])
+
+    def test_reproject_unsupported_spatial_reference(self):
+        input = {"x": 392917.31, "y": 298521.34, "spatialReference": {"wkid": 27700}}
+
+        with patch("arcgis2geojson.get_transform", return_value=None):
+            with patch("arcgis2geojson.logger") as mock_logger:
+                output = arcgis2geojson(input, reproject=True)
+        mock_logger.warning.assert_called_once_with(
+            "Object converted in non-standard crs - {'wkid': 27700}"
+        )
+        self.assertEqual(output["coordinates"], [392917.31, 298521.34])
+
+    @unittest.skipIf(importlib.util.find_spec("pyproj") is None, "requires pyproj")
+    def test_reproject_pyproj(self):
+        input = {"x": 530000, "y": 180000, "spatialReference": {"wkid": 27700}}
+
+        output = arcgis2geojson(input, reproject=True)
+        self.assertAlmostEqual(output["coordinates"][0], -0.129, places=2)
+        self.assertAlmostEqual(output["coordinates"][1], 51.50, places=2)
+
+    def test_warning_if_crs_not_4326_once_per_layer(self):
+        input = {
+            "geometryType": "esriGeometryPoint",
+            "spatialReference": {"wkid": 27700},
+            "features": [
+                {
+                    "geometry": {
+                        "x": 392917.31 + i,
+                        "y": 298521.34,
+                        "spatialReference": {"wkid": 27700},
+                    },
+                    "attributes": {"OBJECTID": i},
+                }
+                for i in range(5)
+            ],
+        }
+
+        with self.assertLogs("arcgis2geojson", "WARNING") as logs:
+            output = arcgis2geojson(input)
+        self.assertEqual(
+            logs.output,
+            [
+                "WARNING:arcgis2geojson:Object converted in non-standard crs - {'wkid': 27700}"
+            ],
+        )
+        self.assertEqual(len(output["features"]), 5)
+
+        with self.assertLogs("arcgis2geojson", "WARNING") as logs:
+            output = list(iter_convert(io.StringIO(json.dumps(input))))
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(len(output), 5)
+
+    def test_iter_convert_feature_collection(self):
+        input = {
+            "geometryType": "esriGeometryPoint",
+            "spatialReference": {"wkid": 4326},
+            "features": [
+                {
+                    "geometry": {"x": -66.796875, "y": 20.0390625},
+                    "attributes": {"OBJECTID": 1, "name": "caf\u00e9"},
+                },
+                {
+                    "geometry": {"x": 6.6796875, "y": 47.8125},
+                    "attributes": {"OBJECTID": 2, "name": "bar"},
+                },
+            ],
+            "exceededTransferLimit": False,
+        }
+        expected = arcgis2geojson(input)["features"]
+
+        text = json.dumps(input, indent=2)
+        self.assertEqual(list(iter_convert(io.StringIO(text), readSize=7)), expected)
+
+        # binary file objects are decoded incrementally, even mid-character
+        data = json.dumps(input, ensure_ascii=False).encode("utf-8")
+        self.assertEqual(list(iter_convert(io.BytesIO(data), readSize=3)), expected)
+
+    def test_iter_convert_invalid_read_size(self):
+        with self.assertRaisesRegex(ValueError, "readSize"):
+            list(iter_convert(io.StringIO('{"features": []}'), readSize=0))
+
+    def test_iter_convert_custom_id_field(self):
+        input = json.dumps(
+            {"features": [{"geometry": {"x": 1, "y": 2}, "attributes": {"FooID": 123}}]}
+        )
+        output = list(iter_convert(io.StringIO(input), "FooID"))
+        self.assertEqual(output[0]["id"], 123)
+
+    def test_iter_convert_empty_features(self):
+        output = iter_convert(io.StringIO('{"features": [], "count": 12345}'))
+        self.assertEqual(list(output), [])
+
+    def test_iter_convert_without_features(self):
+        input = '{"x": -66.796875, "y": 20.0390625, "z": 10}'
+        output = list(iter_convert(io.StringIO(input), readSize=4))
+        self.assertEqual(
+            output, [{"type": "Point", "coordinates": [-66.796875, 20.0390625, 10]}]
+        )
+
+        # something that converts to nothing yields nothing
+        for input in ("{}", '{"x": null, "y": null}'):
+            self.assertEqual(list(iter_convert(io.StringIO(input))), [])
+
+    def test_iter_convert_invalid_json(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_convert(io.StringIO('{"features": [{"x": 1, "y": 2}')))
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_convert(io.StringIO('[{"x": 1, "y": 2}]')))
+
+    def test_aiter_convert_stub_server(self):
+        server = StubFeatureServer(25)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/query"
+            output = asyncio.run(
+                collect(aiter_convert(fetchPages(url, 10), concurrency=2))
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertEqual([feature["id"] for feature in output], list(range(25)))
+        self.assertEqual(
+            output[3],
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [3, 3]},
+                "properties": {"OBJECTID": 3},
+                "id": 3,
+            },
+        )
+        # the page after the last can have been requested ahead of time, but
+        # not the one after that
+        self.assertEqual(server.requests[:3], [0, 10, 20])
+        self.assertLessEqual(len(server.requests), 4)
+
+    def test_aiter_convert_stops_at_last_page(self):
+        read = []
+
+        async def pages():
+            for i in range(5):
+                read.append(i)
+                page = {"features": [{"geometry": {"x": i, "y": i}}]}
+                if i < 2:
+                    page["exceededTransferLimit"] = True
+                # pages can be text, but then whether there are more isn't
+                # known until they're parsed
+                yield json.dumps(page) if i == 0 else page
+
+        output = asyncio.run(collect(aiter_convert(pages(), concurrency=4)))
+        self.assertEqual(
+            [feature["geometry"]["coordinates"] for feature in output],
+            [[0, 0], [1, 1], [2, 2]],
+        )
+        self.assertEqual(read, [0, 1, 2])
+
+    def test_aiter_convert_invalid_concurrency(self):
+        async def pages():
+            yield {"features": [{"geometry": {"x": 1, "y": 2}}]}
+
+        for concurrency in (0, -1):
+            with self.assertRaisesRegex(ValueError, "concurrency"):
+                asyncio.run(collect(aiter_convert(pages(), concurrency=concurrency)))
+
+    def test_dump(self):
+        input = json.loads(fixture("parcels.json"))
+        expected = arcgis2geojson(fixture("parcels.json"))
+
+        with io.StringIO() as buf:
+            dump(input, buf)
+            self.assertEqual(buf.getvalue(), expected)
+        self.assertEqual(input, json.loads(fixture("parcels.json")))
+
+        with io.BytesIO() as buf:
+            dump(fixture("parcels.json"), buf)
+            self.assertEqual(buf.getvalue().decode("utf-8"), expected)
+            self.assertFalse(buf.closed)
+
+        for input in ({"x": 1, "y": 2}, {"features": []}):
+            with io.StringIO() as buf:
+                dump(input, buf)
+                self.assertEqual(buf.getvalue(), arcgis2geojson(json.dumps(input)))
+
+    @unittest.skipIf(importlib.util.find_spec("orjson") is None, "requires orjson")
+    def test_dump_with_orjson_backend(self):
+        input = fixture("parcels.json")
+        expected = arcgis2geojson(input.encode("utf-8"), jsonBackend="orjson")
+        self.assertIsInstance(expected, bytes)
+
+        with io.BytesIO() as buf:
+            dump(input, buf, jsonBackend="orjson")
+            self.assertEqual(buf.getvalue(), expected)
+        with io.StringIO() as buf:
+            dump(input, buf, jsonBackend="orjson")
+            self.assertEqual(buf.getvalue(), expected.decode("utf-8"))
+
+        for outputFormat, writer in OUTPUT_FORMATS.items():
+            with io.BytesIO() as binary, io.StringIO() as text:
+                writer(iter_convert(io.StringIO(input)), binary, "orjson")
+                writer(iter_convert(io.StringIO(input)), text, "orjson")
+                self.assertEqual(binary.getvalue().decode("utf-8"), text.getvalue())
+                if outputFormat == "geojson":
+                    self.assertEqual(binary.getvalue(), expected)
+
+    def test_write_feature_collection(self):
+        input = {
+            "features": [
+                {"geometry": {"x": -66.796875, "y": 20.0390625}, "attributes": {}},
+                {"geometry": {"x": 6.6796875, "y": 47.8125}, "attributes": {}},
+            ]
+        }
+        with io.StringIO() as buf:
+            write_feature_collection(iter_convert(io.StringIO(json.dumps(input))), buf)
+            self.assertEqual(buf.getvalue(), arcgis2geojson(json.dumps(input)))
+
+    def test_write_ndjson(self):
+        features = [
+            {"type": "Feature", "geometry": None, "properties": {"a": 1}},
+            {"type": "Feature", "geometry": None, "properties": {"a": 2}},
+        ]
+        with io.StringIO() as buf:
+            write_ndjson(iter(features), buf)
+            lines = buf.getvalue().split("\n")
+        self.assertEqual(lines[-1], "")
+        self.assertEqual([json.loads(line) for line in lines[:-1]], features)
+
+    def test_write_geojsonseq(self):
+        features = [
+            {"type": "Feature", "geometry": None, "properties": {"a": 1}},
+            {"type": "Feature", "geometry": None, "properties": {"a": 2}},
+        ]
+        with io.StringIO() as buf:
+            write_geojsonseq(iter(features), buf)
+            self.assertEqual(
+                buf.getvalue(),
+                "".join(f"\x1e{json.dumps(feature)}\n" for feature in features),
+            )
+
+    def test_convert_parallel(self):
+        input = {
+            "spatialReference": {"wkid": 4326},
+            "features": [
+                {
+                    "geometry": {"x": i, "y": -i},
+                    "attributes": {"OBJECTID": i, "FooID": i * 10},
+                }
+                for i in range(25)
+            ],
+        }
+
+        output = convert_parallel(input, "FooID", workers=2, chunksize=4)
+        self.assertEqual(output, arcgis2geojson(input, "FooID"))
+        self.assertEqual(output["features"][-1]["id"], 240)
+
+        for chunksize in (0, -1):
+            with self.assertRaisesRegex(ValueError, "chunksize"):
+                convert_parallel(input, workers=2, chunksize=chunksize)
+        for workers in (0, -1):
+            with self.assertRaisesRegex(ValueError, "workers"):
+                convert_parallel(input, workers=workers)
+
+    def test_convert_parallel_logs_worker_warnings(self):
+        input = {
+            "features": [
+                {"geometry": {"x": 1, "y": 2}, "attributes": {}},
+                {"geometry": {"curvePaths": []}, "attributes": {}},
+            ]
+        }
+
+        with self.assertLogs("arcgis2geojson", "WARNING") as logs:
+            output = convert_parallel(input, workers=2, chunksize=1)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("Curved Polyline", logs.records[0].getMessage())
+        self.assertEqual(output["features"][0]["geometry"]["type"], "Point")
+
+    def test_convert_parallel_not_a_feature_collection(self):
+        input = {"x": -66.796875, "y": 20.0390625}
+        self.assertEqual(convert_parallel(input), arcgis2geojson(input))
+
     def test_cli(self):
         input = (
             '{ "x": -66.796875, "y": 20.0390625, "spatialReference": { "wkid": 4326 } }'
@@ -790,6 +2075,401 @@ class ArcGisToGeoJsonTests(unittest.TestCase):
                 self.assertEqual(0, main())
                 self.assertEqual(buf.getvalue().strip(), arcgis2geojson(input))
 
+    def test_cli_jobs(self):
+        input = json.dumps(
+            {
+                "features": [
+                    {"geometry": {"x": i, "y": i}, "attributes": {"OBJECTID": i}}
+                    for i in range(3)
+                ]
+            }
+        )
+        with patch("sys.argv", ["arcgis2geojson", "--jobs", "2"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(buf.getvalue(), arcgis2geojson(input))
+
+        for jobs in ("0", "-1", "two"):
+            with patch("sys.argv", ["arcgis2geojson", "--jobs", jobs]):
+                with io.StringIO() as buf, redirect_stderr(buf):
+                    with self.assertRaises(SystemExit) as raised:
+                        main()
+                    self.assertEqual(raised.exception.code, 2)
+                    self.assertIn("argument --jobs", buf.getvalue())
+
+    @unittest.skipIf(importlib.util.find_spec("orjson") is None, "requires orjson")
+    def test_cli_json_backend(self):
+        input = '{ "x": -66.796875, "y": 20.0390625 }'
+        with patch("sys.argv", ["arcgis2geojson", "--json-backend", "orjson"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        buf.getvalue(),
+                        '{"type":"Point","coordinates":[-66.796875,20.0390625]}',
+                    )
+
+        input = fixture("parcels.json")
+        expected = arcgis2geojson(input.encode("utf-8"), jsonBackend="orjson")
+        for jobs in ("1", "2"):
+            argv = ["arcgis2geojson", "--json-backend", "orjson", "--jobs", jobs]
+            stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+            with patch("sys.argv", argv):
+                with patch("sys.stdin", io.StringIO(input)), redirect_stdout(stdout):
+                    self.assertEqual(0, main())
+            stdout.flush()
+            self.assertEqual(stdout.buffer.getvalue(), expected)
+
+    def test_cli_reproject(self):
+        input = '{"x": 0, "y": 0, "spatialReference": {"wkid": 102100}}'
+        with patch("sys.argv", ["arcgis2geojson", "--reproject"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        json.loads(buf.getvalue()),
+                        {"type": "Point", "coordinates": [0.0, 0.0]},
+                    )
+
+    def test_cli_input_format_pbf(self):
+        expected = convert(json.loads(fixture("parcels.json")))
+        path = os.path.join(FIXTURES, "parcels.pbf")
+        for jobs in ("1", "2"):
+            with patch(
+                "sys.argv",
+                ["arcgis2geojson", "--input-format", "pbf", "--jobs", jobs, path],
+            ):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(json.loads(buf.getvalue()), expected)
+
+    def test_cli_precision(self):
+        input = '{"paths": [[[1.23456, 2.34567], [1.23457, 2.34568], [5, 6]]]}'
+        with patch("sys.argv", ["arcgis2geojson", "--precision", "3", "--dedupe"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        json.loads(buf.getvalue()),
+                        {"type": "LineString", "coordinates": [[1.235, 2.346], [5, 6]]},
+                    )
+
+    def test_cli_simplify(self):
+        input = '{"paths": [[[0, 0], [1, 0.01], [2, 0]]]}'
+        with patch("sys.argv", ["arcgis2geojson", "--simplify", "0.1"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        json.loads(buf.getvalue()),
+                        {"type": "LineString", "coordinates": [[0, 0], [2, 0]]},
+                    )
+
+    def test_cli_stats(self):
+        input = '{"rings": [[[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]]}'
+        with patch("sys.argv", ["arcgis2geojson", "--stats"]):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as out, redirect_stdout(out):
+                    with io.StringIO() as err, redirect_stderr(err):
+                        self.assertEqual(0, main())
+                        report = err.getvalue()
+                    self.assertEqual(json.loads(out.getvalue())["type"], "Polygon")
+        self.assertRegex(report, r"parse +\d+\.\d{4}s")
+        self.assertRegex(report, r"vertices +5\n")
+
+        # streamed output still reports converting and serialising apart
+        for outputFormat in ("geojson", "ndjson"):
+            argv = ["arcgis2geojson", "--stats", "--output-format", outputFormat]
+            with patch("sys.argv", argv):
+                with patch("sys.stdin", io.StringIO(fixture("parcels.json"))):
+                    with io.StringIO() as out, redirect_stdout(out):
+                        with io.StringIO() as err, redirect_stderr(err):
+                            self.assertEqual(0, main())
+                            report = err.getvalue()
+            for stage in ("parse", "convert", "serialise"):
+                self.assertRegex(report, stage + r" +\d+\.\d{4}s")
+            self.assertNotIn("stream", report)
+
+        with collect_stats() as stats, io.StringIO() as buf:
+            dump(fixture("parcels.json"), buf)
+        self.assertLessEqual({"parse", "convert", "serialise"}, set(stats.timings))
+
+    def test_cli_compact(self):
+        input = fixture("parcels.json")
+        expected = json.loads(arcgis2geojson(input))
+        for jobs in ("1", "2"):
+            with patch("sys.argv", ["arcgis2geojson", "--compact", "--jobs", jobs]):
+                with patch("sys.stdin", io.StringIO(input)):
+                    with io.StringIO() as buf, redirect_stdout(buf):
+                        self.assertEqual(0, main())
+                        self.assertEqual(json.loads(buf.getvalue()), expected)
+
+    def test_cli_gzip(self):
+        input = fixture("parcels.json")
+        expected = json.loads(arcgis2geojson(input))
+
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with patch("sys.argv", ["arcgis2geojson", "--gzip"]):
+            with patch("sys.stdin", io.StringIO(input)), redirect_stdout(stdout):
+                self.assertEqual(0, main())
+        stdout.flush()
+        self.assertEqual(
+            json.loads(gzip.decompress(stdout.buffer.getvalue())), expected
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "parcels.json")
+            with open(path, "w") as f:
+                f.write(input)
+            with patch("sys.argv", ["arcgis2geojson", tmp, "--gzip"]):
+                with io.StringIO() as buf, redirect_stderr(buf):
+                    self.assertEqual(0, main())
+            with gzip.open(os.path.join(tmp, "parcels.geojson.gz"), "rt") as f:
+                self.assertEqual(json.load(f), expected)
+
+    def test_cli_compressed_input(self):
+        expected = json.loads(arcgis2geojson(fixture("parcels.json")))
+        with tempfile.TemporaryDirectory() as tmp:
+            with gzip.open(os.path.join(tmp, "parcels.json.gz"), "wb") as f:
+                f.write(fixture("parcels.json", "rb"))
+            with open(os.path.join(tmp, "plain.json"), "w") as f:
+                f.write(fixture("parcels.json"))
+
+            for outputFormat in ("geojson", "ndjson"):
+                argv = ["arcgis2geojson", tmp, "--output-format", outputFormat]
+                with patch("sys.argv", argv):
+                    with io.StringIO() as buf, redirect_stderr(buf):
+                        self.assertEqual(0, main())
+                        self.assertIn("converted 2 of 2 files", buf.getvalue())
+
+            with open(os.path.join(tmp, "parcels.geojson")) as f:
+                self.assertEqual(json.load(f), expected)
+            with open(os.path.join(tmp, "parcels.ndjson")) as f:
+                self.assertEqual([json.loads(line) for line in f], expected["features"])
+
+    def test_cli_duplicate_output_paths(self):
+        expected = json.loads(arcgis2geojson(fixture("parcels.json")))
+        for jobs in ("1", "2"):
+            with tempfile.TemporaryDirectory() as tmp:
+                with open(os.path.join(tmp, "a.json"), "w") as f:
+                    f.write(fixture("parcels.json"))
+                with gzip.open(os.path.join(tmp, "a.json.gz"), "wb") as f:
+                    f.write(fixture("parcels.json", "rb"))
+                with open(os.path.join(tmp, "b.json"), "w") as f:
+                    f.write(fixture("parcels.json"))
+
+                with patch("sys.argv", ["arcgis2geojson", tmp, "--jobs", jobs]):
+                    with io.StringIO() as buf, redirect_stderr(buf):
+                        self.assertEqual(1, main())
+                        output = buf.getvalue()
+                self.assertIn("converted 1 of 3 files", output)
+                self.assertIn(
+                    "a.json: failed after 0.000s - output would also be written from "
+                    + os.path.join(tmp, "a.json.gz"),
+                    output,
+                )
+                self.assertIn("a.json.gz: failed", output)
+                self.assertFalse(os.path.exists(os.path.join(tmp, "a.geojson")))
+                with open(os.path.join(tmp, "b.geojson")) as f:
+                    self.assertEqual(json.load(f), expected)
+
+    @unittest.skipIf(zstdModule() is None, "requires python 3.14+ or zstandard")
+    def test_cli_zstd(self):
+        zstd = zstdModule()
+        expected = json.loads(arcgis2geojson(fixture("parcels.json")))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "parcels.json.zst")
+            with open(path, "wb") as f:
+                if zstd.__name__ == "zstandard":
+                    f.write(
+                        zstd.ZstdCompressor().compress(fixture("parcels.json", "rb"))
+                    )
+                else:
+                    f.write(zstd.compress(fixture("parcels.json", "rb")))
+            self.assertEqual(load(path), expected)
+
+            with patch("sys.argv", ["arcgis2geojson", tmp, "--compress", "zstd"]):
+                with io.StringIO() as buf, redirect_stderr(buf):
+                    self.assertEqual(0, main())
+            with open(os.path.join(tmp, "parcels.geojson.zst"), "rb") as f:
+                if zstd.__name__ == "zstandard":
+                    output = zstd.ZstdDecompressor().stream_reader(f).read()
+                else:
+                    output = zstd.decompress(f.read())
+            self.assertEqual(json.loads(output), expected)
+
+    def test_cli_filter(self):
+        input = fixture("parcels.json")
+        expected = convert(json.loads(input), "OBJECTID")["features"]
+        for jobs in ("1", "2"):
+            with patch(
+                "sys.argv",
+                [
+                    "arcgis2geojson",
+                    "--id",
+                    "OBJECTID",
+                    "--fields",
+                    "NAME:name",
+                    "--where",
+                    "NOTES=two parts",
+                    "--where",
+                    "AREA=8",
+                    "--bbox",
+                    "0,0,20,60",
+                    "--no-geometry",
+                    "--jobs",
+                    jobs,
+                ],
+            ):
+                with patch("sys.stdin", io.StringIO(input)):
+                    with io.StringIO() as buf, redirect_stdout(buf):
+                        self.assertEqual(0, main())
+                        self.assertEqual(
+                            json.loads(buf.getvalue())["features"],
+                            [
+                                {
+                                    "type": "Feature",
+                                    "geometry": None,
+                                    "properties": {"name": "Split parcel"},
+                                    "id": 2,
+                                }
+                            ],
+                        )
+
+        with patch(
+            "sys.argv",
+            ["arcgis2geojson", "--where", "NOTES=null", "--output-format", "ndjson"],
+        ):
+            with patch("sys.stdin", io.StringIO(input)):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        [json.loads(line) for line in buf.getvalue().splitlines()],
+                        [expected[0], expected[2]],
+                    )
+
+        with patch("sys.argv", ["arcgis2geojson", "--bbox", "0,0,1"]):
+            with io.StringIO() as buf, redirect_stderr(buf):
+                with self.assertRaises(SystemExit):
+                    main()
+
+    def test_cli_output_format_ndjson(self):
+        input = {
+            "features": [
+                {"geometry": {"x": i, "y": i}, "attributes": {"OBJECTID": i}}
+                for i in range(3)
+            ]
+        }
+        for jobs in ("1", "2"):
+            with patch(
+                "sys.argv",
+                ["arcgis2geojson", "--output-format", "ndjson", "--jobs", jobs],
+            ):
+                with patch("sys.stdin", io.StringIO(json.dumps(input))):
+                    with io.StringIO() as buf, redirect_stdout(buf):
+                        self.assertEqual(0, main())
+                        self.assertEqual(
+                            [json.loads(line) for line in buf.getvalue().splitlines()],
+                            arcgis2geojson(input)["features"],
+                        )
+
+        # streamed (--jobs 1) or not, nothing is written for empty output
+        for input, expected in (
+            ("{}", []),
+            ('{"x": null, "y": null}', []),
+            ('{"x": 1, "y": 2}', [{"type": "Point", "coordinates": [1, 2]}]),
+        ):
+            for jobs in ("1", "2"):
+                argv = ["arcgis2geojson", "--output-format", "ndjson", "--jobs", jobs]
+                with patch("sys.argv", argv), patch("sys.stdin", io.StringIO(input)):
+                    with io.StringIO() as buf, redirect_stdout(buf):
+                        self.assertEqual(0, main())
+                        self.assertEqual(
+                            [json.loads(line) for line in buf.getvalue().splitlines()],
+                            expected,
+                        )
+
+    def test_cli_batch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            inputDir = os.path.join(tmp, "in")
+            outputDir = os.path.join(tmp, "out")
+            os.mkdir(inputDir)
+            for i in range(3):
+                with open(os.path.join(inputDir, f"{i}.json"), "w") as f:
+                    json.dump({"x": i, "y": i}, f)
+            with open(os.path.join(inputDir, "bad.json"), "w") as f:
+                f.write("{")
+
+            for jobs in ("1", "2"):
+                argv = ["arcgis2geojson", inputDir, "--output-dir", outputDir]
+                with patch("sys.argv", argv + ["--jobs", jobs]):
+                    with io.StringIO() as buf, redirect_stderr(buf):
+                        self.assertEqual(1, main())
+                        self.assertIn("bad.json: failed", buf.getvalue())
+                        self.assertIn("converted 3 of 4 files", buf.getvalue())
+
+                self.assertEqual(
+                    sorted(os.listdir(outputDir)),
+                    ["0.geojson", "1.geojson", "2.geojson"],
+                )
+                with open(os.path.join(outputDir, "2.geojson")) as f:
+                    self.assertEqual(
+                        json.load(f), {"type": "Point", "coordinates": [2, 2]}
+                    )
+
+            pattern = os.path.join(inputDir, "[01].json")
+            with patch("sys.argv", ["arcgis2geojson", pattern, "--suffix", ".out"]):
+                with io.StringIO() as buf, redirect_stderr(buf):
+                    self.assertEqual(0, main())
+            self.assertTrue(os.path.exists(os.path.join(inputDir, "0.out")))
+            self.assertTrue(os.path.exists(os.path.join(inputDir, "1.out")))
+
+    def test_cli_batch_failure_keeps_existing_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "a.json"), "w") as f:
+                json.dump({"x": 1, "y": 2}, f)
+            with open(os.path.join(tmp, "bad.json"), "w") as f:
+                f.write("{")
+            for name in ("missing.geojson", "bad.geojson"):
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write("existing")
+
+            paths = [os.path.join(tmp, name) for name in ("a.json", "missing.json")]
+            paths.append(os.path.join(tmp, "bad.json"))
+            for jobs in ("1", "2"):
+                with patch("sys.argv", ["arcgis2geojson", *paths, "--jobs", jobs]):
+                    with io.StringIO() as buf, redirect_stderr(buf):
+                        self.assertEqual(1, main())
+                        self.assertIn("converted 1 of 3 files", buf.getvalue())
+
+                self.assertEqual(
+                    sorted(os.listdir(tmp)),
+                    [
+                        "a.geojson",
+                        "a.json",
+                        "bad.geojson",
+                        "bad.json",
+                        "missing.geojson",
+                    ],
+                )
+                for name in ("missing.geojson", "bad.geojson"):
+                    with open(os.path.join(tmp, name)) as f:
+                        self.assertEqual(f.read(), "existing")
+
+    def test_cli_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "input.json")
+            with open(path, "w") as f:
+                json.dump({"x": 1, "y": 2}, f)
+            with patch("sys.argv", ["arcgis2geojson", path]):
+                with io.StringIO() as buf, redirect_stdout(buf):
+                    self.assertEqual(0, main())
+                    self.assertEqual(
+                        json.loads(buf.getvalue()),
+                        {"type": "Point", "coordinates": [1, 2]},
+                    )
+
     def test_cli_stdin_is_tty(self):
         with patch("sys.stdin.isatty", return_value=True):
             with io.StringIO() as buf, redirect_stdout(buf):